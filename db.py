@@ -12,8 +12,8 @@
 # -------------------------------------------------------
 
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 from dotenv import load_dotenv
 
 # === 수정: override=True 버전은 필요 없으므로 주석 처리
@@ -40,11 +40,36 @@ if not DATABASE_URL:
 #
 # check_same_thread=False :
 #   - FastAPI의 비동기 환경에서 SQLite 사용 시 필수
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
+
 connect_args = {}
-if DATABASE_URL.startswith("sqlite"):
+if IS_SQLITE:
     connect_args = {"check_same_thread": False}
 
 
+# =======================================================
+# 커넥션 풀 설정
+# =======================================================
+# pool_pre_ping=True :
+#   - 커넥션을 꺼내 쓰기 전에 살아있는지 가볍게 확인한다.
+#   - Render(Postgres) 에서 유휴 커넥션이 끊겨서 생기는
+#     "server closed the connection" 에러를 막아준다.
+#
+# Postgres 등 서버형 DB 에서만 풀 크기/재활용 옵션을 준다.
+# (SQLite 는 파일 DB 라서 이 옵션들이 의미가 없거나 지원되지 않는다.)
+#   - SQLALCHEMY_POOL_SIZE    : 항상 유지할 커넥션 수 (기본 10)
+#   - SQLALCHEMY_MAX_OVERFLOW : 잠깐 더 열 수 있는 커넥션 수 (기본 20)
+#   - SQLALCHEMY_POOL_RECYCLE : 이 시간(초)이 지난 커넥션은 새로 연결 (기본 1800)
+pool_kwargs = {"pool_pre_ping": True}
+if not IS_SQLITE:
+    pool_kwargs.update(
+        pool_size=int(os.getenv("SQLALCHEMY_POOL_SIZE", "10")),
+        max_overflow=int(os.getenv("SQLALCHEMY_MAX_OVERFLOW", "20")),
+        pool_timeout=20,
+        pool_recycle=int(os.getenv("SQLALCHEMY_POOL_RECYCLE", "1800")),
+    )
+
+
 # =======================================================
 # 엔진 생성: SQLAlchemy의 "핵심"
 # =======================================================
@@ -56,9 +81,32 @@ engine = create_engine(
     echo=False,
     future=True,
     connect_args=connect_args,
+    **pool_kwargs,
 )
 
 
+# =======================================================
+# SQLite 전용 PRAGMA (로컬 개발 환경)
+# =======================================================
+# deps.get_connection() 의 diary_entries 연결과 같은 설정을
+# SQLAlchemy 가 새 커넥션을 열 때마다 한 번씩 걸어 준다.
+# - journal_mode=WAL   : 쓰는 중에도 다른 요청이 읽을 수 있다. (DB 파일에 기록되는 설정)
+# - synchronous=NORMAL : WAL 에서는 이 정도면 충분히 안전하고 fsync 가 줄어든다.
+# - temp_store=MEMORY  : 정렬용 임시 데이터를 메모리에서 처리
+# - cache_size=-8000   : 커넥션당 약 8MB 페이지 캐시
+if IS_SQLITE:
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_conn, connection_record):
+        cur = dbapi_conn.cursor()
+        try:
+            cur.execute("PRAGMA journal_mode=WAL")
+            cur.execute("PRAGMA synchronous=NORMAL")
+            cur.execute("PRAGMA temp_store=MEMORY")
+            cur.execute("PRAGMA cache_size=-8000")
+        finally:
+            cur.close()
+
+
 # =======================================================
 # SessionLocal: DB 세션을 만들어주는 factory
 # =======================================================
@@ -101,10 +149,8 @@ def get_db():
     - 요청이 끝나면 finally: db.close() 로 세션을 반드시 닫는다.
 
     이렇게 해야 connection leak(세션이 안 닫힘)을 방지할 수 있다.
+    한 요청 안에서는 이 세션 하나를 모든 load_*/save_* 함수가 같이 쓴다.
     """
-
-    from sqlalchemy.orm import Session
-
     db: Session = SessionLocal()
     try:
         yield db  # 라우터 함수로 전달되는 부분
@@ -7,25 +7,34 @@
 # - Basic Auth(아이디/비번) 의존성
 # ---------------------------------------------
 
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
-# === 수정: datetime 은 이 파일에서 사용하지 않아서 제거해도 된다.
-#           date 만 사용되므로, 불필요한 import 를 줄여줌.
-from datetime import date
-import json
+from datetime import date  # datetime 모듈 전체가 아니라 date 만 사용
+import hashlib
 import os
+import queue
 import secrets
 import sqlite3
-from typing import List
+import threading
+import time
+from typing import Iterable, Iterator, List
 
-from fastapi import HTTPException, Depends, status
+import orjson
+from fastapi import HTTPException, Depends, Request, status
+from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
+from jinja2 import FileSystemBytecodeCache, Template
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
-from starlette.status import HTTP_401_UNAUTHORIZED
 from pydantic import BaseModel
 from dotenv import load_dotenv
+from sqlalchemy import delete, insert, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
 
-# SQLAlchemy 세션 / ORM 모델
-from db import SessionLocal
+# ORM 모델 (세션은 라우터에서 Depends(get_db) 로 주입받는다)
 from models import Schedule, Todo  # models.py 에 정의한 ORM 클래스 사용
 
 
@@ -57,6 +66,7 @@ DB_PATH = DATA_DIR / "steplog.db"
 ITEMS_PER_PAGE_LIST    = 10
 ITEMS_PER_PAGE_GALLERY = 50
 HISTORY_ITEMS_PER_PAGE = 20  # 체크리스트 완료/포기 히스토리 페이지당 개수
+DASHBOARD_UPCOMING_LIMIT = 20  # 대시보드 '다가오는 일정' 최대 표시 개수
 
 # JSON 파일 경로 (과거 JSON 기반 데이터 구조를 위해 남겨둔 상수)
 #   지금 메인 기능은 모두 DB 기반이지만,
@@ -67,37 +77,184 @@ TODOS_FILE    = DATA_DIR / "todos.json"      # 체크리스트
 # .env 파일에서 환경변수 로드 (DIARY_USER 등)
 load_dotenv()
 
+# 인증용 ID/PW 는 프로세스 시작 시 한 번만 읽어서 bytes 로 보관한다.
+# (요청마다 os.getenv 를 부르지 않고, compare_digest 에 바로 넘길 수 있게)
+_DIARY_USER = (os.getenv("DIARY_USER") or "").encode("utf-8")
+_DIARY_PASS = (os.getenv("DIARY_PASSWORD") or "").encode("utf-8")
+_STEPLOG_USER = os.getenv("STEPLOG_USER", "squapple").encode("utf-8")
+_STEPLOG_PASS = os.getenv("STEPLOG_PASS", "september18!&").encode("utf-8")
+
 # HTTP Basic 인증 객체
 security = HTTPBasic()
 
 # Jinja 템플릿 엔진 (templates/ 폴더를 기준으로 템플릿을 찾는다)
 templates = Jinja2Templates(directory="templates")
 
+# auto_reload=True(기본값)면 렌더링할 때마다 템플릿 파일 수정 시각을 확인한다.
+# 운영에서는 배포 때만 템플릿이 바뀌므로 끄고, 로컬에서 템플릿을 고치면서 볼 때만
+# JINJA_AUTO_RELOAD=1 로 켠다.
+templates.env.auto_reload = os.getenv("JINJA_AUTO_RELOAD", "0") == "1"
+
+# 컴파일된 템플릿 바이트코드를 캐시 폴더에 저장해 두고,
+# 워커가 새로 뜰 때 템플릿을 다시 파싱하지 않고 바로 불러온다.
+# 폴더는 지정하지 않는다: Jinja 가 사용자별 폴더(_jinja2-cache-<uid>)를 0o700 으로 만들고,
+# 심볼릭 링크이거나 다른 사용자 소유 폴더면 쓰지 않고 에러를 낸다.
+# (바이트코드는 그대로 unmarshal 되어 실행되므로 다른 사용자가 끼워 넣을 수 있는 폴더를 쓰면 안 된다.)
+templates.env.bytecode_cache = FileSystemBytecodeCache()
+
+# 자주 열리는 페이지 템플릿은 서버 시작 때(main.lifespan) 미리 컴파일해서 잡아 둔다.
+# render_page() 는 여기서 바로 꺼내 쓰므로 요청마다 get_template() 조회와
+# TemplateResponse 객체 생성을 하지 않는다.
+_PAGE_TEMPLATE_NAMES = (
+    "dashboard.html",
+    "diary.html",
+    "schedule.html",
+    "todos.html",
+    "todos_history.html",
+    "stats.html",
+)
+_page_templates: dict[str, Template] = {}
+
+
+def preload_templates() -> None:
+    """
+    _PAGE_TEMPLATE_NAMES 의 템플릿을 미리 컴파일해 둔다.
+    (JINJA_AUTO_RELOAD=1 이면 파일 수정이 바로 보여야 하므로 잡아 두지 않는다.)
+    """
+    if templates.env.auto_reload:
+        return
+    for name in _PAGE_TEMPLATE_NAMES:
+        _page_templates[name] = templates.get_template(name)
+
+
+def render_page(name: str, context: dict, headers: dict | None = None) -> HTMLResponse:
+    """
+    템플릿을 렌더링해서 HTMLResponse 로 돌려준다. (templates.TemplateResponse 대신 사용)
+
+    - context 에는 TemplateResponse 때와 마찬가지로 "request" 를 꼭 넣는다.
+      (base.html 의 request.url_for / url_for() 가 사용)
+    - 미리 컴파일해 둔 템플릿이 없으면 그때그때 get_template() 으로 찾는다.
+    """
+    template = _page_templates.get(name) or templates.get_template(name)
+    return HTMLResponse(template.render(context), headers=headers)
+
 
 # =========================
 # (구) SQLite DB 유틸 – 일기용
 # =========================
 
-def get_connection() -> sqlite3.Connection:
+# journal_mode=WAL 은 DB 파일에 기록되는 설정이라 프로세스당 한 번만 걸면 된다.
+_wal_enabled = False
+
+# 열어 둔 SQLite 연결을 큐(pool)에 보관해 두고 요청마다 빌려 쓰고 돌려준다.
+# (매번 connect 하면 DB 헤더를 다시 읽고, 페이지 캐시/statement 캐시도 날아간다.)
+# - 최대 _POOL_SIZE 개까지만 보관하고, 그보다 많이 동시에 필요하면
+#   임시 연결을 열었다가 반납할 때 닫는다.
+_POOL_SIZE = 5
+_POOL: "queue.Queue[sqlite3.Connection]" = queue.Queue(maxsize=_POOL_SIZE)
+
+
+def _open_connection() -> sqlite3.Connection:
+    """
+    새 SQLite 연결을 하나 열고 성능용 PRAGMA 를 걸어서 돌려준다.
+
+    성능용 PRAGMA:
+    - journal_mode=WAL    : 쓰는 중에도 다른 요청이 읽을 수 있다.
+    - synchronous=NORMAL  : WAL 에서는 이 정도면 충분히 안전하고 fsync 가 줄어든다.
+    - temp_store=MEMORY   : 정렬용 임시 데이터를 메모리에서 처리
+    - mmap_size / cache_size : 디스크 read() 대신 메모리 매핑/페이지 캐시 사용
+
+    isolation_level=None :
+    - 파이썬 sqlite3 가 몰래 BEGIN 을 붙이지 않는 autocommit 모드.
+      여러 쿼리를 묶고 싶을 때는 직접 BEGIN / COMMIT 을 실행한다.
+    """
+    global _wal_enabled
+
+    conn = sqlite3.connect(
+        DB_PATH,
+        isolation_level=None,
+        check_same_thread=False,
+        cached_statements=256,  # 준비된(prepared) statement 캐시 크기
+    )
+    # row 를 dict 처럼 사용할 수 있게 해 주는 설정
+    conn.row_factory = sqlite3.Row
+
+    if not _wal_enabled:
+        conn.execute("PRAGMA journal_mode=WAL")
+        _wal_enabled = True
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA mmap_size=268435456")
+    conn.execute("PRAGMA cache_size=-20000")
+    return conn
+
+
+@contextmanager
+def get_connection() -> Iterator[sqlite3.Connection]:
     """
     옛날 일기/백업 코드에서 쓰는 로컬 SQLite 연결 함수.
 
     - diary_entries 테이블을 사용하는 용도에만 사용한다.
     - 일정(Schedule) / 체크리스트(Todo)는 SQLAlchemy 세션을 사용하므로
       여기 연결과는 별개이다.
+    - 사용법: `with get_connection() as conn:`
+      pool 에서 연결을 하나 빌려 주고, 블록이 끝나면 다시 pool 에 돌려놓는다.
+      (예외가 나면 열려 있던 트랜잭션은 ROLLBACK 후 반납)
     """
-    conn = sqlite3.connect(DB_PATH)
-    # row 를 dict 처럼 사용할 수 있게 해 주는 설정
-    conn.row_factory = sqlite3.Row
-    return conn
+    try:
+        conn = _POOL.get_nowait()
+    except queue.Empty:
+        conn = _open_connection()
+
+    try:
+        yield conn
+    except Exception:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+    finally:
+        try:
+            _POOL.put_nowait(conn)
+        except queue.Full:
+            _close_connection(conn)
+
+
+def _close_connection(conn: sqlite3.Connection) -> None:
+    """
+    연결을 닫기 전에 PRAGMA optimize 를 실행한다.
+    (이 연결에서 실행한 쿼리를 보고, 필요한 테이블만 통계를 갱신해서
+     쿼리 플래너가 인덱스를 잘 고르게 해 준다. 필요 없으면 거의 비용 없음)
+    """
+    try:
+        conn.execute("PRAGMA optimize")
+    except sqlite3.Error:
+        pass
+    finally:
+        conn.close()
+
+
+def close_pool() -> None:
+    """
+    pool 에 보관 중인 SQLite 연결을 모두 닫는다. (앱 종료 시 lifespan 에서 호출)
+    """
+    while True:
+        try:
+            conn = _POOL.get_nowait()
+        except queue.Empty:
+            return
+        _close_connection(conn)
 
 
 def init_db() -> None:
     """
     앱 시작 시 한 번만 호출해서, diary_entries 테이블이 없으면 생성한다.
     (SQLAlchemy 가 아닌, 순수 SQLite 쿼리를 쓰는 부분)
+
+    스키마 작업은 pool 에서 재사용하는 연결이 아니라
+    잠깐 쓰고 닫는 별도 연결에서 처리한다.
     """
-    with get_connection() as conn:
+    conn = _open_connection()
+    try:
         cur = conn.cursor()
 
         # 일기 테이블 (id 기준으로 upsert 하는 구조)
@@ -115,12 +272,31 @@ def init_db() -> None:
             """
         )
 
+        # load_all_entries 의 ORDER BY created_at DESC, id DESC 용 인덱스
+        # (이미 테이블이 있는 기존 DB 에도 생기도록 IF NOT EXISTS 로 따로 실행)
+        index_existed = cur.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?",
+            ("ix_diary_entries_created_id",),
+        ).fetchone() is not None
+        cur.execute(
+            """
+            CREATE INDEX IF NOT EXISTS ix_diary_entries_created_id
+            ON diary_entries (created_at DESC, id DESC)
+            """
+        )
+
+        # 인덱스를 처음 만든 경우에만 통계를 갱신해서
+        # 쿼리 플래너가 새 인덱스를 바로 쓰도록 한다.
+        if not index_existed:
+            cur.execute("ANALYZE diary_entries")
+
         conn.commit()
+    finally:
+        conn.close()
 
 
-# 모듈이 import 될 때 자동으로 한 번 실행해서
-# diary_entries 테이블이 없으면 만들어 둔다.
-init_db()
+# init_db() 는 import 시점이 아니라 main.py 의 lifespan(앱 시작 시)에서
+# 프로세스당 한 번만 호출한다.
 
 
 # =========================
@@ -135,19 +311,23 @@ def require_auth(credentials: HTTPBasicCredentials = Depends(security)):
 
     ID/PW 는 .env 파일에 넣어 두고 사용:
       DIARY_USER, DIARY_PASSWORD
+    (값은 모듈 import 시점에 _DIARY_USER / _DIARY_PASS 로 한 번만 읽어 둔다.)
     """
-    correct_user = os.getenv("DIARY_USER")
-    correct_pass = os.getenv("DIARY_PASSWORD")
-
     # 환경변수가 설정되지 않았다면 서버 설정 문제이므로 500 에러
-    if not correct_user or not correct_pass:
+    # (스크립트에서 deps 를 import 만 하는 경우도 있어서 import 시점에 죽이지는 않는다.)
+    if not _DIARY_USER or not _DIARY_PASS:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Auth env vars (DIARY_USER / DIARY_PASSWORD) are not set.",
         )
 
+    # 문자열 비교 시 timing attack 을 막기 위해 compare_digest 사용
+    # (and 대신 & 를 써서 아이디가 틀려도 비밀번호 비교까지 항상 수행)
+    ok_user = secrets.compare_digest(credentials.username.encode("utf-8"), _DIARY_USER)
+    ok_pass = secrets.compare_digest(credentials.password.encode("utf-8"), _DIARY_PASS)
+
     # 아이디/비밀번호가 하나라도 다르면 401 Unauthorized
-    if credentials.username != correct_user or credentials.password != correct_pass:
+    if not (ok_user & ok_pass):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials",
@@ -158,6 +338,46 @@ def require_auth(credentials: HTTPBasicCredentials = Depends(security)):
     return credentials.username
 
 
+# =========================
+# ETag (조건부 GET → 304)
+# =========================
+# 테이블에 updated_at 컬럼이 없어서, 응답에 들어가는 데이터 자체를 해시해서
+# 약한(weak) ETag 를 만든다. 데이터가 하나라도 바뀌면 값이 달라지므로
+# 워커가 여러 개여도 안전하다. (대시보드/일기/일정 API/통계에서 같이 사용)
+
+def weak_etag(*parts) -> str:
+    """
+    parts(orjson 으로 직렬화할 수 있는 값들)로 약한 ETag 문자열 W/"..." 를 만든다.
+    """
+    payload = orjson.dumps(parts)
+    return 'W/"' + hashlib.blake2b(payload, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    브라우저가 보낸 If-None-Match 에 etag 가 들어 있으면 True. (→ 304 로 끝내면 된다)
+    """
+    if_none_match = request.headers.get("if-none-match")
+    return bool(if_none_match) and etag in (t.strip() for t in if_none_match.split(","))
+
+
+# =========================
+# 오늘 날짜 의존성
+# =========================
+
+async def get_today() -> tuple[date, str]:
+    """
+    (오늘 date, "YYYY-MM-DD" 문자열) 을 돌려주는 의존성.
+
+    - 핸들러에서 today, today_str = Depends(get_today) 로 받아 쓴다.
+    - FastAPI 가 요청마다 한 번만 계산해서 캐시하므로, 한 요청 안에서는
+      자정을 넘겨도 모든 비교가 같은 '오늘' 을 쓴다.
+    - I/O 가 없는 함수라 async def 로 둔다. (def 면 스레드풀을 한 번 더 거친다)
+    """
+    today = date.today()
+    return today, today.isoformat()
+
+
 # =========================
 # 공통 유틸 (기록)
 # =========================
@@ -171,45 +391,113 @@ def _normalize_entry(entry: dict) -> dict:
       (문자열이면 쉼표로 split 해서 리스트로 변환)
     """
     content = entry.get("content") or ""
-    if isinstance(content, str):
+    if isinstance(content, str) and "\r" in content:
         # 윈도우 스타일(\r\n)을 유닉스 스타일(\n)로 통일
-        entry["content"] = content.replace("\r\n", "\n")
-
-    tags = entry.get("tags") or []
+        # ("\r" 이 없는 대부분의 글은 replace 로 새 문자열을 만들지 않는다.)
+        content = content.replace("\r\n", "\n")
+    entry["content"] = content
+
+    tags = entry.get("tags")
+    if isinstance(tags, list):
+        # DB 에서 읽은 값은 이미 리스트인 경우가 대부분
+        return entry
     if isinstance(tags, str):
         # "a, b, c" → ["a", "b", "c"]
-        tags = [t.strip() for t in tags.split(",") if t.strip()]
-    entry["tags"] = tags
+        tags = _parse_tags(tags)
+    entry["tags"] = tags or []
 
     return entry
 
 
+@lru_cache(maxsize=4096)
+def _split_tags(text: str) -> tuple[str, ...]:
+    """
+    _parse_tags 의 실제 분리 작업. (결과 캐시)
+    같은 태그 문자열("운동, 공부" 등)이 여러 글/요청에 반복되므로 한 번 분리한 결과를 재사용한다.
+    캐시 안에 두는 값이라 바뀌지 않도록 tuple 로 돌려준다.
+    """
+    # split / strip / 빈 값 제거를 모두 C 구현 내장 함수로 한 번에 처리
+    return tuple(filter(None, map(str.strip, text.split(","))))
+
+
 def _parse_tags(text: str) -> list[str]:
     """
     텍스트로 들어온 태그(쉼표 구분)를 리스트로 변환.
     예: "운동, 일기" → ["운동", "일기"]
+
+    호출하는 쪽에서 리스트를 고쳐 써도 캐시가 오염되지 않도록 매번 새 리스트를 만든다.
     """
     if not text:
         return []
-    return [t.strip() for t in text.split(",") if t.strip()]
+    return list(_split_tags(text))
 
 
 # =========================
 # 일기(기록) 관련: SQLite 버전
 # =========================
 
+# 자주 쓰는 SQL 문은 모듈 상수로 한 번만 만들어 둔다.
+# pool 에서 재사용하는 연결(get_connection)의 statement 캐시가
+# 같은 문자열을 키로 찾기 때문에, 매번 SQL 을 다시 파싱하지 않는다.
+_SQL_LOAD_ENTRY = """
+    SELECT id, title, content, image_url, created_at, updated_at, tags
+    FROM diary_entries
+    WHERE id = ?
+"""
+
+_SQL_UPSERT_ENTRY = """
+    INSERT INTO diary_entries (id, title, content, image_url, created_at, updated_at, tags)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(id) DO UPDATE SET
+        title      = excluded.title,
+        content    = excluded.content,
+        image_url  = excluded.image_url,
+        created_at = excluded.created_at,
+        updated_at = excluded.updated_at,
+        tags       = excluded.tags
+"""
+
+_SQL_DELETE_ENTRY = "DELETE FROM diary_entries WHERE id = ?"
+
+# 목록 조회 (최신순). LIMIT -1 은 SQLite 에서 "제한 없음" 을 뜻한다.
+_SQL_LOAD_ALL = """
+    SELECT id, title, content, image_url, created_at, updated_at, tags
+    FROM diary_entries
+    ORDER BY created_at DESC, id DESC
+    LIMIT ?
+"""
+
+# 키셋(keyset) 페이지네이션: 이전 페이지 마지막 (created_at, id) 보다 "뒤" 만 조회.
+# OFFSET 처럼 앞 페이지를 전부 건너뛰며 읽지 않고, 인덱스에서 바로 이어서 읽는다.
+_SQL_LOAD_AFTER = """
+    SELECT id, title, content, image_url, created_at, updated_at, tags
+    FROM diary_entries
+    WHERE (created_at, id) < (?, ?)
+    ORDER BY created_at DESC, id DESC
+    LIMIT ?
+"""
+
+
+# JSON 으로 저장된 tags 는 항상 배열('[') 또는 문자열('"') 로 시작한다.
+_JSON_TAG_PREFIX = ('[', '"')
+
+
 def _decode_tags(tags_raw: str | None) -> list[str]:
     """
     DB에 저장된 tags 필드를 파이썬 리스트로 변환.
 
-    - JSON 문자열이면 json.loads 로 변환
+    - JSON 문자열이면 orjson.loads 로 변환 (C 구현이라 json 보다 빠름)
     - JSON 이 아니면 그냥 쉼표 구분 문자열이라고 보고 파싱
+      ('[' / '"' 로 시작하지 않으면 JSON 파싱을 시도하지 않는다. 예외 비용 절약)
     """
     if not tags_raw:
         return []
+    if tags_raw[0] not in _JSON_TAG_PREFIX:
+        # 예전 형식(쉼표 구분 문자열)
+        return _parse_tags(tags_raw)
     try:
-        return json.loads(tags_raw)
-    except json.JSONDecodeError:
+        return orjson.loads(tags_raw)
+    except orjson.JSONDecodeError:
         # 예전 형식이거나 그냥 문자열일 경우
         return _parse_tags(tags_raw)
 
@@ -222,14 +510,7 @@ def load_entry(entry_id: str) -> dict:
     - 태그/줄바꿈 포맷을 _decode_tags / _normalize_entry 로 정리해서 반환한다.
     """
     with get_connection() as conn:
-        cur = conn.execute(
-            """
-            SELECT id, title, content, image_url, created_at, updated_at, tags
-            FROM diary_entries
-            WHERE id = ?
-            """,
-            (entry_id,),
-        )
+        cur = conn.execute(_SQL_LOAD_ENTRY, (entry_id,))
         row = cur.fetchone()
 
     if row is None:
@@ -237,8 +518,29 @@ def load_entry(entry_id: str) -> dict:
 
     entry = dict(row)
     entry["tags"] = _decode_tags(entry.get("tags"))
-    entry = _normalize_entry(entry)
-    return entry
+    return _normalize_entry(entry)
+
+
+def _entry_params(entry_id: str, entry: dict) -> tuple:
+    """
+    일기 dict 를 _SQL_UPSERT_ENTRY 에 넘길 파라미터 튜플로 변환.
+    (save_entry_json / save_entries_bulk 공용)
+    """
+    # 원본 딕셔너리를 건드리지 않기 위해 copy() 후 정규화
+    entry = _normalize_entry(entry.copy())
+    tags = entry.get("tags") or []
+    # orjson 은 한글을 이스케이프하지 않은 UTF-8 bytes 로 만들어 준다.
+    tags_json = orjson.dumps(tags).decode("utf-8")
+
+    return (
+        entry_id,
+        entry.get("title", ""),
+        entry.get("content", ""),
+        entry.get("image_url"),
+        entry.get("created_at"),
+        entry.get("updated_at"),
+        tags_json,
+    )
 
 
 def save_entry_json(entry_id: str, entry: dict) -> None:
@@ -247,34 +549,30 @@ def save_entry_json(entry_id: str, entry: dict) -> None:
 
     - id 가 없으면 새로 INSERT
     - id 가 이미 있으면 UPDATE (ON CONFLICT 절을 이용)
+    - 연결이 autocommit 모드라 문장 하나가 곧 트랜잭션 하나다. (commit 불필요)
     """
-    # 원본 딕셔너리를 건드리지 않기 위해 copy() 후 정규화
-    entry = _normalize_entry(entry.copy())
-    tags = entry.get("tags") or []
-    tags_json = json.dumps(tags, ensure_ascii=False)
+    with get_connection() as conn:
+        conn.execute(_SQL_UPSERT_ENTRY, _entry_params(entry_id, entry))
+
+
+def save_entries_bulk(entries: Iterable[tuple[str, dict]]) -> None:
+    """
+    여러 일기를 한 번에 저장 (INSERT 또는 UPDATE).
 
-    title = entry.get("title", "")
-    content = entry.get("content", "")
-    image_url = entry.get("image_url")
-    created_at = entry.get("created_at")
-    updated_at = entry.get("updated_at")
+    - entries: (entry_id, entry dict) 튜플들
+    - 마이그레이션/가져오기 스크립트처럼 여러 건을 저장할 때
+      save_entry_json 을 반복 호출하면 건마다 commit(fsync) 이 일어나므로,
+      executemany + BEGIN/COMMIT 한 번으로 묶어서 처리한다.
+    """
+    params = [_entry_params(entry_id, entry) for entry_id, entry in entries]
+    if not params:
+        return
 
     with get_connection() as conn:
-        conn.execute(
-            """
-            INSERT INTO diary_entries (id, title, content, image_url, created_at, updated_at, tags)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(id) DO UPDATE SET
-                title      = excluded.title,
-                content    = excluded.content,
-                image_url  = excluded.image_url,
-                created_at = excluded.created_at,
-                updated_at = excluded.updated_at,
-                tags       = excluded.tags
-            """,
-            (entry_id, title, content, image_url, created_at, updated_at, tags_json),
-        )
-        conn.commit()
+        # 실패하면 get_connection 이 ROLLBACK 해 준다.
+        conn.execute("BEGIN")
+        conn.executemany(_SQL_UPSERT_ENTRY, params)
+        conn.execute("COMMIT")
 
 
 def delete_entry_json(entry_id: str) -> None:
@@ -283,37 +581,189 @@ def delete_entry_json(entry_id: str) -> None:
     - id 에 해당하는 row 를 DELETE.
     """
     with get_connection() as conn:
-        conn.execute("DELETE FROM diary_entries WHERE id = ?", (entry_id,))
-        conn.commit()
+        conn.execute(_SQL_DELETE_ENTRY, (entry_id,))
 
 
-def load_all_entries() -> list[dict]:
+def load_all_entries(
+    limit: int | None = None,
+    cursor: tuple[str, str] | None = None,
+) -> list[dict]:
     """
-    전체 일기 목록 로드 (최신순).
+    일기 목록 로드 (최신순).
 
     - diary_index 화면에서 목록/검색용으로 사용.
     - created_at 기준 내림차순 → id 내림차순 순으로 정렬.
+    - limit 를 주면 SQL 에서 그 개수만큼만 가져온다. (None 이면 전체)
+    - cursor 에 이전 페이지 마지막 항목의 (created_at, id) 를 주면
+      그 다음 항목부터 이어서 가져온다. (키셋 페이지네이션)
     """
+    sql_limit = -1 if limit is None else limit
+
     with get_connection() as conn:
-        cur = conn.execute(
-            """
-            SELECT id, title, content, image_url, created_at, updated_at, tags
-            FROM diary_entries
-            ORDER BY created_at DESC, id DESC
-            """
-        )
+        # 이 쿼리는 sqlite3.Row 대신 튜플로 받는다. (컬럼 이름 조회 비용 절약)
+        cur = conn.cursor()
+        cur.row_factory = None
+        if cursor is None:
+            cur.execute(_SQL_LOAD_ALL, (sql_limit,))
+        else:
+            cur.execute(_SQL_LOAD_AFTER, (cursor[0], cursor[1], sql_limit))
         rows = cur.fetchall()
 
+    return _rows_to_entries(rows)
+
+
+def iter_all_entries(batch_size: int = 500) -> Iterator[dict]:
+    """
+    일기 전체를 최신순으로 batch_size 개씩 끊어서 하나씩 돌려주는 제너레이터.
+
+    - 마이그레이션/백업처럼 전체를 한 번 훑기만 하면 되는 곳에서 사용.
+    - load_all_entries() 처럼 전체 리스트를 메모리에 한꺼번에 만들지 않는다.
+    - 커서 하나로 fetchmany 하므로 created_at 이 비어 있는 행도 빠지지 않는다.
+    - 다 읽을 때까지 pool 연결 하나를 잡고 있으므로, 끝까지 소비하거나 close() 할 것.
+    """
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.row_factory = None
+        cur.execute(_SQL_LOAD_ALL, (-1,))
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from _rows_to_entries(rows)
+
+
+def _rows_to_entries(rows: list[tuple]) -> list[dict]:
+    """
+    diary_entries 튜플 행들 → 화면용 일기 dict 리스트.
+    (load_all_entries / iter_all_entries 공용)
+    """
+    # _decode_tags / _normalize_entry 와 같은 처리를 한 루프 안에서 바로 한다.
+    # (행마다 dict 복사 + 함수 호출을 여러 번 하지 않도록)
+    loads = orjson.loads
+    decode_error = orjson.JSONDecodeError
+    parse = _parse_tags
+    json_prefix = _JSON_TAG_PREFIX
+
     entries: list[dict] = []
-    for row in rows:
-        e = dict(row)
-        e["id"] = e["id"]
-        e["tags"] = _decode_tags(e.get("tags"))
-        entries.append(_normalize_entry(e))
+    append = entries.append
+    for entry_id, title, content, image_url, created_at, updated_at, tags_raw in rows:
+        if not content:
+            content = ""
+        elif "\r" in content:
+            content = content.replace("\r\n", "\n")
+
+        if not tags_raw:
+            tags = []
+        elif tags_raw[0] not in json_prefix:
+            # 쉼표 구분 문자열(예전 형식)은 JSON 파싱 시도 없이 바로 분리
+            tags = parse(tags_raw)
+        else:
+            try:
+                tags = loads(tags_raw)
+            except decode_error:
+                tags = parse(tags_raw)
+            if isinstance(tags, str):
+                tags = parse(tags)
+            elif not tags:
+                tags = []
+
+        append({
+            "id": entry_id,
+            "title": title,
+            "content": content,
+            "image_url": image_url,
+            "created_at": created_at,
+            "updated_at": updated_at,
+            "tags": tags,
+        })
 
     return entries
 
 
+# =========================
+# 일정/체크리스트 조회 캐시
+# =========================
+# 대시보드는 페이지를 열 때마다 load_schedule / load_todos 를 둘 다 호출한다.
+# 짧은 시간(_CACHE_TTL 초) 동안은 이미 만들어 둔 리스트를 그대로 돌려주고,
+# 일정/체크리스트가 바뀌면 invalidate_cache() 로 바로 비운다.
+#   - key: "schedule" / "todos" (기간별은 "schedule:..." 처럼 그룹 이름 + ":")
+#   - value: (저장 시각, 정렬까지 끝난 리스트)
+#
+# 버전(_cache_versions):
+#   invalidate_cache() 가 호출될 때마다 그룹별 버전을 1씩 올린다.
+#   조회 함수는 DB 를 읽기 "전" 버전을 받아 두었다가 _cache_set 에 넘기고,
+#   그 사이에 저장(invalidate)이 끼어들었으면 옛날 결과는 캐시에 넣지 않는다.
+#   (TTL 은 워커 프로세스가 여러 개일 때 다른 워커의 수정을 반영하기 위한 안전장치)
+#
+# 같은 프로세스 안의 수정은 invalidate_cache() 로 바로 반영되므로
+# TTL 은 길게 잡아도 된다. (기본 30초, 환경변수 STEPLOG_CACHE_TTL 로 조절)
+#   - 워커를 여러 개 띄우는 경우에는 짧게, 0 이면 캐시를 쓰지 않는다.
+_CACHE_TTL = float(os.getenv("STEPLOG_CACHE_TTL", "30"))
+_cache: dict[str, tuple[float, list]] = {}
+_cache_versions: dict[str, int] = {}
+_cache_lock = threading.Lock()
+
+
+def _cache_group(key: str) -> str:
+    # "schedule:2025-01-01:2025-01-16" → "schedule"
+    return key.partition(":")[0]
+
+
+def _cache_version(key: str) -> int:
+    """
+    key 가 속한 그룹의 현재 버전. (DB 를 읽기 전에 받아 두고 _cache_set 에 넘긴다)
+    """
+    with _cache_lock:
+        return _cache_versions.get(_cache_group(key), 0)
+
+
+def _cache_get(key: str) -> list | None:
+    """
+    캐시에 살아있는 값이 있으면 얕은 복사본을 돌려준다. (없거나 만료면 None)
+    - 호출한 쪽에서 리스트를 수정해도 캐시 원본은 바뀌지 않게 list() 로 복사.
+    """
+    with _cache_lock:
+        hit = _cache.get(key)
+        if hit is None:
+            return None
+        stored_at, items = hit
+        if time.monotonic() - stored_at > _CACHE_TTL:
+            _cache.pop(key, None)
+            return None
+        return list(items)
+
+
+def _cache_set(key: str, items: list, version: int) -> None:
+    """
+    조회 결과를 캐시에 저장.
+    - version 이 현재 버전과 다르면(읽는 도중 수정됨) 저장하지 않는다.
+    - _CACHE_TTL 이 0 이하이면 캐시를 쓰지 않는다.
+    """
+    if _CACHE_TTL <= 0:
+        return
+    with _cache_lock:
+        if _cache_versions.get(_cache_group(key), 0) != version:
+            return
+        _cache[key] = (time.monotonic(), list(items))
+
+
+def invalidate_cache(*keys: str) -> None:
+    """
+    일정/체크리스트를 수정한 뒤 호출해서 캐시를 비운다.
+    예) invalidate_cache("todos"), invalidate_cache("schedule", "todos")
+
+    - "schedule" 을 비우면 기간별로 저장된 "schedule:..." 캐시도 같이 비운다.
+    - 그룹 버전을 올려서, 지금 DB 를 읽고 있는 조회가 옛날 결과를 캐시하지 못하게 한다.
+    """
+    with _cache_lock:
+        for key in keys:
+            group = _cache_group(key)
+            _cache_versions[group] = _cache_versions.get(group, 0) + 1
+            prefix = key + ":"
+            for cached_key in [k for k in _cache if k == key or k.startswith(prefix)]:
+                del _cache[cached_key]
+
+
 # =========================
 # 일정 관련 – SQLAlchemy 버전
 # =========================
@@ -334,7 +784,25 @@ class ScheduleItem(BaseModel):
     place: str | None = None     # 장소 (선택)
 
 
-def schedule_sort_key(item: ScheduleItem):
+@dataclass(slots=True)
+class ScheduleRow:
+    """
+    읽기 전용(화면 렌더링) 용 일정 데이터.
+
+    - 필드는 ScheduleItem 과 같지만 Pydantic 검증을 거치지 않는 가벼운 객체.
+    - DB 에서 읽은 값은 이미 형식이 맞으므로 load_schedule 에서는 이걸 쓰고,
+      검증이 필요한 입력 처리에는 ScheduleItem 을 쓴다.
+    """
+    id: str
+    date: str
+    title: str
+    memo: str | None = None
+    time: str | None = None
+    time_str: str | None = None
+    place: str | None = None
+
+
+def schedule_sort_key(item: ScheduleItem | ScheduleRow) -> str:
     """
     일정 정렬 키:
 
@@ -343,110 +811,239 @@ def schedule_sort_key(item: ScheduleItem):
     3) 그 다음에 시간(HH:MM) 오름차순
 
     → 이렇게 하면 "날짜별로 위에서 아래로 자연스러운 일정 리스트"가 만들어진다.
+
+    DB 의 schedules.sort_key 와 같은 문자열을 그대로 키로 쓴다.
+    (date.fromisoformat / 튜플 생성 없이 문자열 비교만으로 같은 순서가 된다.)
     """
-    # 문자열("YYYY-MM-DD") → date 객체
-    d = date.fromisoformat(item.date)
+    return schedule_sort_value(item.date, item.time_str or item.time)
 
-    # time_str 또는 time 필드 중 하나를 사용
-    t_str = (item.time_str or item.time or "").strip()
 
-    if t_str:
-        try:
-            h, m = map(int, t_str.split(":"))
-        except ValueError:
-            # 시간 파싱이 실패하면 가장 뒤로 밀기 위해 23:59 로 취급
-            h, m = 23, 59
-        # has_time=1 이면 시간 있음 → 날짜 안에서 뒤쪽으로
-        has_time = 1
+def schedule_sort_value(date_str: str, time_str: str | None) -> str:
+    """
+    schedules.sort_key 컬럼에 저장할 문자열을 만든다.
+
+    - 날짜 → 시간 순서가 문자열 비교로 유지되도록 "YYYY-MM-DDTHH:MM" 형태로 만든다.
+    - 시간이 없으면 "YYYY-MM-DDT" 로 끝나서 같은 날짜의 시간 있는 일정보다 앞에 온다.
+    - 시간은 0 을 채운 HH:MM 으로 통일 (파싱 실패 시 23:59)
+
+    일정을 저장할 때 이 값을 같이 넣어 두면,
+    읽을 때는 ORDER BY sort_key 만으로 정렬이 끝난다.
+    """
+    t_str = (time_str or "").strip()
+    if not t_str:
+        return f"{date_str}T"
+    try:
+        h, m = map(int, t_str.split(":"))
+    except ValueError:
+        h, m = 23, 59
+    return f"{date_str}T{h:02d}:{m:02d}"
+
+
+# ScheduleRow 를 만드는 데 필요한 컬럼만 조회한다.
+# (ORM 객체를 만들어 identity map 에 등록하지 않고 가벼운 Row 로 받는다)
+_SCHEDULE_ROW_COLUMNS = (
+    Schedule.id,
+    Schedule.date,
+    Schedule.title,
+    Schedule.memo,
+    Schedule.time_str,
+    Schedule.place,
+)
+
+
+def _to_schedule_row(row) -> ScheduleRow:
+    """
+    _SCHEDULE_ROW_COLUMNS 로 조회한 Row (또는 Schedule ORM 객체) → 화면용 ScheduleRow 변환.
+    """
+    # row.date 가 date 객체일 수도 있고, 문자열일 수도 있으므로 통일
+    if isinstance(row.date, date):
+        date_str = row.date.isoformat()
     else:
-        # 시간 정보가 없는 일정은 has_time=0 으로 해서 날짜 안에서 먼저 오게 함
-        h, m = 0, 0
-        has_time = 0
+        date_str = str(row.date)
+
+    time_str = getattr(row, "time_str", None)
+    time_raw = getattr(row, "time", None)
+    if not time_str and time_raw:
+        time_str = str(time_raw)
 
-    return (d, has_time, h, m)
+    return ScheduleRow(
+        id=str(row.id),
+        date=date_str,
+        title=row.title,
+        memo=row.memo,
+        time=time_raw,
+        time_str=time_str,
+        place=row.place,
+    )
 
 
-def load_schedule() -> List[ScheduleItem]:
+def load_schedule(db: Session) -> List[ScheduleRow]:
     """
     일정 전체 로드 – SQLAlchemy schedules 테이블 사용.
 
     - / (대시보드), /schedule, /backup 등에서
       모두 이 함수를 통해 같은 일정 데이터를 보게 된다.
+    - db 세션은 호출하는 쪽(Depends(get_db))에서 넘겨준다.
+      → 한 요청 안에서 일정/체크리스트를 같이 읽어도 커넥션 하나만 쓴다.
+    - 결과는 잠깐 캐시해 둔다. (_cache_get / invalidate_cache 참고)
     """
-    db = SessionLocal()
-    try:
-        rows = (
-            db.query(Schedule)
-            .order_by(Schedule.date, Schedule.title)
-            .all()
+    cached = _cache_get("schedule")
+    if cached is not None:
+        return cached
+    version = _cache_version("schedule")
+
+    # 정렬은 저장할 때 미리 계산해 둔 sort_key 컬럼으로 처리한다.
+    # (schedule_sort_value 참고: 날짜 → 시간 없음 먼저 → 시간 순)
+    rows = (
+        db.query(*_SCHEDULE_ROW_COLUMNS)
+        .order_by(Schedule.sort_key.asc(), Schedule.title.asc())
+        .all()
+    )
+
+    items = [_to_schedule_row(row) for row in rows]
+    _cache_set("schedule", items, version)
+    return items
+
+
+def load_schedule_between(
+    db: Session,
+    start: date,
+    end: date,
+    limit: int | None = None,
+) -> List[ScheduleRow]:
+    """
+    start ~ end (양 끝 포함) 기간의 일정만 로드.
+
+    - 대시보드의 "다가오는 일정(오늘 ~ 15일 뒤)" 처럼 일부 기간만 필요할 때
+      테이블 전체를 읽지 않고 WHERE date BETWEEN 으로 DB 에서 걸러 온다.
+    - 정렬은 load_schedule 과 같은 sort_key 순서.
+    - limit 를 주면 정렬 순서대로 앞에서 limit 개만 가져온다. (SQL LIMIT)
+    """
+    key = f"schedule:{start.isoformat()}:{end.isoformat()}:{limit}"
+    cached = _cache_get(key)
+    if cached is not None:
+        return cached
+    version = _cache_version(key)
+
+    query = (
+        db.query(*_SCHEDULE_ROW_COLUMNS)
+        .filter(Schedule.date.between(start.isoformat(), end.isoformat()))
+        .order_by(Schedule.sort_key.asc(), Schedule.title.asc())
+    )
+    if limit is not None:
+        query = query.limit(limit)
+    rows = query.all()
+    items = [_to_schedule_row(row) for row in rows]
+
+    _cache_set(key, items, version)
+    return items
+
+
+def load_schedule_dates(db: Session, start: date, end: date) -> frozenset[str]:
+    """
+    start ~ end 기간 중 일정이 하나라도 있는 날짜("YYYY-MM-DD") 집합.
+    (대시보드 달력의 '일정 있음' 점 표시용 – SELECT DISTINCT date 만 조회)
+
+    - 변경 불가능한 frozenset 으로 돌려줘서 캐시 키로도 바로 쓸 수 있다.
+    """
+    key = f"schedule:dates:{start.isoformat()}:{end.isoformat()}"
+    cached = _cache_get(key)
+    if cached is not None:
+        return frozenset(cached)
+    version = _cache_version(key)
+
+    dates = [
+        d for (d,) in
+        db.query(Schedule.date)
+        .filter(Schedule.date.between(start.isoformat(), end.isoformat()))
+        .distinct()
+        .all()
+    ]
+
+    _cache_set(key, dates, version)
+    return frozenset(dates)
+
+
+# _sync_rows 에서 DELETE ... WHERE id IN (...) 한 번에 넣는 id 개수
+# (SQLite 는 SQL 한 문장의 바인드 파라미터 수에 제한이 있다: 옛 빌드는 999, 최근은 32766)
+_SYNC_DELETE_BATCH = 500
+
+
+def _sync_rows(db: Session, model, rows: list[dict]) -> None:
+    """
+    rows(dict 리스트)가 테이블의 최종 상태가 되도록 반영하는 공통 함수.
+    (save_schedule / save_todos 에서 사용)
+
+    - rows 에 없는 기존 id → 기존 id 를 읽어서 파이썬에서 차집합을 구하고
+      _SYNC_DELETE_BATCH 개씩 DELETE (WHERE id IN (...))
+        * NOT IN (남길 id 전부) 로 지우면 행 수만큼 파라미터가 생겨서
+          행이 많을 때 "too many SQL variables" 로 저장이 실패한다.
+    - id 가 있는 행 → INSERT ... ON CONFLICT(id) DO UPDATE 한 번 (executemany)
+        * 값이 하나도 안 바뀐 행은 WHERE 조건으로 UPDATE 자체를 건너뛴다.
+    - id 가 없는 행 → 그냥 INSERT (id 는 DB 가 자동 발급)
+
+    → 테이블 전체를 지우고 다시 쓰지 않고, 바뀐 행만 실제로 쓰게 된다.
+    """
+    table = model.__table__
+    keyed_rows = [r for r in rows if r["id"] is not None]
+    new_rows = [{k: v for k, v in r.items() if k != "id"} for r in rows if r["id"] is None]
+
+    # 1) 사라진 행 삭제
+    keep_ids = {r["id"] for r in keyed_rows}
+    stale_ids = [i for i in db.scalars(select(table.c.id)) if i not in keep_ids]
+    for start in range(0, len(stale_ids), _SYNC_DELETE_BATCH):
+        chunk = stale_ids[start:start + _SYNC_DELETE_BATCH]
+        db.execute(delete(table).where(table.c.id.in_(chunk)))
+
+    # 2) UPSERT (Postgres / SQLite 모두 ON CONFLICT 문법 지원)
+    if keyed_rows:
+        if db.get_bind().dialect.name == "postgresql":
+            stmt = pg_insert(table)
+        else:
+            stmt = sqlite_insert(table)
+        fields = [k for k in keyed_rows[0] if k != "id"]
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.id],
+            set_={f: stmt.excluded[f] for f in fields},
+            where=or_(*(table.c[f].is_distinct_from(stmt.excluded[f]) for f in fields)),
         )
+        db.execute(stmt, keyed_rows)
 
-        items: list[ScheduleItem] = []
-        for row in rows:
-            # row.date 가 date 객체일 수도 있고, 문자열일 수도 있으므로 통일
-            if isinstance(row.date, date):
-                date_str = row.date.isoformat()
-            else:
-                date_str = str(row.date)
-
-            time_str = getattr(row, "time_str", None)
-            time_raw = getattr(row, "time", None)
-            if not time_str and time_raw:
-                time_str = str(time_raw)
-
-            items.append(
-                ScheduleItem(
-                    id=str(row.id),
-                    date=date_str,
-                    title=row.title,
-                    memo=row.memo,
-                    time=time_raw,
-                    time_str=time_str,
-                    place=row.place,
-                )
-            )
+    # 3) id 없는 새 행
+    if new_rows:
+        db.execute(insert(table), new_rows)
 
-        # 위에서 만든 ScheduleItem 리스트를 우리가 정의한 키로 정렬
-        items.sort(key=schedule_sort_key)
-        return items
-    finally:
-        db.close()
+    db.commit()
 
 
-def save_schedule(items: List[ScheduleItem]) -> None:
+def save_schedule(db: Session, items: List[ScheduleItem]) -> None:
     """
-    일정 전체 저장 – schedules 테이블을 '통째로 갈아끼우는' 방식.
+    일정 전체 저장 – items 리스트가 schedules 테이블의 최종 상태가 된다.
 
-    - 기존 데이터를 모두 삭제한 뒤,
-    - 전달받은 items 리스트를 순서대로 다시 INSERT 한다.
+    - 전달받은 items 와 기존 데이터를 비교해서
+      추가/수정/삭제된 일정만 반영한다. (_sync_rows)
     """
-    db = SessionLocal()
-    try:
-        # 기존 일정 전부 삭제
-        db.query(Schedule).delete()
+    rows = []
+    for it in items:
+        # id 가 숫자로 넘어올 수도 있고, 문자열일 수도 있어서 한 번 정리
+        try:
+            int_id = int(it.id)
+        except (TypeError, ValueError):
+            int_id = None
 
-        for it in items:
-            # id 가 숫자로 넘어올 수도 있고, 문자열일 수도 있어서 한 번 정리
-            try:
-                int_id = int(it.id)
-            except (TypeError, ValueError):
-                int_id = None
-
-            time_str = it.time_str or it.time
-
-            row = Schedule(
-                id=int_id,
-                date=it.date,
-                title=it.title,
-                memo=it.memo,
-                time_str=time_str,
-                place=it.place,
-            )
-            db.add(row)
+        time_str = it.time_str or it.time
+        rows.append({
+            "id": int_id,
+            "date": it.date,
+            "title": it.title,
+            "memo": it.memo,
+            "time_str": time_str,
+            "place": it.place,
+            "sort_key": schedule_sort_value(it.date, time_str),
+        })
 
-        db.commit()
-    finally:
-        db.close()
+    _sync_rows(db, Schedule, rows)
+    invalidate_cache("schedule")
 
 
 # =========================
@@ -467,92 +1064,98 @@ class TodoItem(BaseModel):
     status: str = "pending"  # "pending" / "done" / "giveup"
 
 
-def load_todos() -> List[TodoItem]:
+@dataclass(slots=True)
+class TodoRow:
+    """
+    읽기 전용(화면 렌더링) 용 Todo 데이터. (검증 없는 TodoItem)
     """
-    SQLAlchemy todos 테이블에서 TodoItem 리스트 로드.
+    id: str
+    date: str
+    title: str
+    status: str = "pending"
+
+
+def load_todos(db: Session) -> List[TodoRow]:
+    """
+    SQLAlchemy todos 테이블에서 TodoRow 리스트 로드.
 
     ★ 핵심: 여기서 order 컬럼을 기준으로 정렬해 준다.
       - /todos 화면의 '진행 중' 리스트
       - 대시보드의 오늘 체크리스트
       둘 다 이 순서를 그대로 사용한다.
+    - 결과는 잠깐 캐시해 둔다. (_cache_get / invalidate_cache 참고)
     """
-    db = SessionLocal()
-    try:
-        rows = (
-            db.query(Todo)
-            .order_by(Todo.date, Todo.order, Todo.id)  # order 기준 정렬
-            .all()
-        )
-
-        items: list[TodoItem] = []
-        for row in rows:
-            if isinstance(row.date, date):
-                date_str = row.date.isoformat()
-            else:
-                date_str = str(row.date)
-
-            status = row.status or "pending"
-            if status not in ("pending", "done", "giveup"):
-                status = "pending"
-
-            items.append(
-                TodoItem(
-                    id=str(row.id),
-                    date=date_str,
-                    title=row.title,
-                    status=status,
-                )
+    cached = _cache_get("todos")
+    if cached is not None:
+        return cached
+    version = _cache_version("todos")
+
+    # TodoRow 에 필요한 컬럼만 Row 로 받는다. (ORM 객체를 만들지 않음)
+    rows = (
+        db.query(Todo.id, Todo.date, Todo.title, Todo.status)
+        .order_by(Todo.date, Todo.order, Todo.id)  # order 기준 정렬
+        .all()
+    )
+
+    items: list[TodoRow] = []
+    for row in rows:
+        if isinstance(row.date, date):
+            date_str = row.date.isoformat()
+        else:
+            date_str = str(row.date)
+
+        status = row.status or "pending"
+        if status not in ("pending", "done", "giveup"):
+            status = "pending"
+
+        items.append(
+            TodoRow(
+                id=str(row.id),
+                date=date_str,
+                title=row.title,
+                status=status,
             )
+        )
 
-        return items
-    finally:
-        db.close()
+    _cache_set("todos", items, version)
+    return items
 
 
-def save_todos(items: List[TodoItem]) -> None:
+def save_todos(db: Session, items: List[TodoItem]) -> None:
     """
-    TodoItem 리스트를 todos 테이블에 저장 (전체 재저장).
+    TodoItem 리스트를 todos 테이블에 저장 (items 가 최종 상태가 된다).
 
     - /todos 화면에서 새로 추가 / 제목 수정 / 순서 조정할 때 사용.
     - 순서는 items 리스트의 순서를 기준으로:
         * 진행 중(pending)인 항목만 0,1,2,... 의 order 를 부여
         * 완료/포기 항목은 큰 번호(100000+)를 줘서 뒤쪽으로 밀어 둔다.
+    - 기존 데이터와 비교해서 바뀐 항목만 반영한다. (_sync_rows)
     """
-    db = SessionLocal()
-    try:
-        # 기존 todo 를 모두 지우고 새로 채운다.
-        db.query(Todo).delete()
-
-        # 진행 중 / 그 외 상태 분리
-        pending_items = [it for it in items if it.status == "pending"]
-        other_items   = [it for it in items if it.status != "pending"]
-
-        # 진행 중: order = 0,1,2,...
-        for idx, it in enumerate(pending_items):
-            row = Todo(
-                id=it.id,
-                date=it.date,
-                title=it.title,
-                status=it.status,
-                order=idx,
-            )
-            db.add(row)
-
-        # 완료/포기: order = 100000 + idx (순서가 크게 중요하지 않은 애들)
-        base = 100000
-        for idx, it in enumerate(other_items):
-            row = Todo(
-                id=it.id,
-                date=it.date,
-                title=it.title,
-                status=it.status,
-                order=base + idx,
-            )
-            db.add(row)
-
-        db.commit()
-    finally:
-        db.close()
+    # 진행 중: order = 0,1,2,...
+    # 완료/포기: order = 100000 + idx (순서가 크게 중요하지 않은 애들)
+    # → 리스트를 한 번만 돌면서 상태별 카운터로 order 를 계산한다.
+    base = 100000
+    pending_idx = 0
+    other_idx = 0
+    rows = []
+    for it in items:
+        if it.status == "pending":
+            order = pending_idx
+            pending_idx += 1
+        else:
+            order = base + other_idx
+            other_idx += 1
+
+        rows.append({
+            "id": it.id,
+            "date": it.date,
+            "title": it.title,
+            "status": it.status,
+            "order": order,
+        })
+
+    _sync_rows(db, Todo, rows)
+    invalidate_cache("todos")
 
 
 # =========================
@@ -570,16 +1173,14 @@ def owner_only(credentials: HTTPBasicCredentials = Depends(security)):
       STEPLOG_USER  : 아이디 (기본값: squapple)
       STEPLOG_PASS  : 비밀번호 (기본값: september18!&)
     """
-    username = os.getenv("STEPLOG_USER", "squapple")
-    password = os.getenv("STEPLOG_PASS", "september18!&")
-
     # 문자열 비교 시 timing attack 을 막기 위해 compare_digest 사용
-    ok_user = secrets.compare_digest(credentials.username, username)
-    ok_pass = secrets.compare_digest(credentials.password, password)
+    # (ID/PW 는 모듈 import 시점에 _STEPLOG_USER / _STEPLOG_PASS 로 읽어 둔 값)
+    ok_user = secrets.compare_digest(credentials.username.encode("utf-8"), _STEPLOG_USER)
+    ok_pass = secrets.compare_digest(credentials.password.encode("utf-8"), _STEPLOG_PASS)
 
-    if not (ok_user and ok_pass):
+    if not (ok_user & ok_pass):
         raise HTTPException(
-            status_code=HTTP_401_UNAUTHORIZED,
+            status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Not authorized",
             headers={"WWW-Authenticate": "Basic"},
         )
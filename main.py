@@ -1,31 +1,33 @@
 # main.py
 
-# 날짜/시간 관련 표준 라이브러리
-from datetime import date, timedelta
-import calendar
+# 표준 라이브러리
+from contextlib import asynccontextmanager, contextmanager
 import logging
+from typing import Iterator
 
-# DB 마이그레이션용 SQL 직접 실행에 사용
-from sqlalchemy import text
+# DB 마이그레이션용 SQL 직접 실행 / 기존 컬럼 확인에 사용
+from sqlalchemy import Connection, inspect, text
 
 # FastAPI 기본 구성 요소들
-from fastapi import FastAPI, Request, Depends
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, Depends
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 
 # 프로젝트에서 공통으로 쓰는 함수/설정들
 from deps import (
     UPLOAD_DIR,       # 업로드 이미지가 저장되는 디렉터리 경로(Path)
     STATIC_DIR,       # CSS/JS 같은 정적 파일 디렉터리
-    load_schedule,    # 일정 목록을 불러오는 함수
-    load_todos,       # TODO 목록을 불러오는 함수
-    schedule_sort_key,# 일정 정렬 기준 함수
-    templates,        # Jinja2 템플릿 객체
     require_auth,     # 전역 Basic 인증(모든 요청에 적용)
+    init_db,          # (구) SQLite diary_entries 테이블 생성
+    close_pool,       # (구) SQLite 연결 pool 정리
+    preload_templates,  # 자주 쓰는 페이지 템플릿 미리 컴파일
+    schedule_sort_value,  # schedules.sort_key 값 계산 (저장할 때와 같은 함수)
 )
 
-# 각 기능별 라우터(일기, 일정, TODO, 통계, 백업/복원)
+# 각 기능별 라우터(대시보드, 일기, 일정, TODO, 통계, 백업/복원)
 from routers import (
+    dashboard_router,
     diary_router,
     schedule_router,
     todos_router,
@@ -44,6 +46,196 @@ import models  # Diary / Schedule / Todo 모델 정의가 들어 있음
 logger = logging.getLogger("steplog")
 
 
+# =========================
+# 앱 시작 시: 테이블 자동 생성 + 컬럼 보정
+# =========================
+
+# 스키마 버전.
+# 모델(테이블/컬럼/인덱스)이나 아래 _migrate_schema() 내용을 바꾸면 이 값도 바꿔야
+# 다음 배포 때 마이그레이션이 한 번 실행된다.
+SCHEMA_REV = "2026-10-f"
+
+# 모델에서 빠진(다른 인덱스로 대체된) 인덱스 이름들. 마이그레이션 때 있으면 삭제한다.
+_DROPPED_INDEXES = (
+    "ix_schedule_date_time",   # → ix_schedule_date_title
+)
+
+
+# 여러 워커(WEB_CONCURRENCY)가 동시에 떠도 마이그레이션은 한 워커만 하도록 거는 잠금.
+#   - SQLite   : BEGIN IMMEDIATE (쓰기 잠금을 트랜잭션 시작과 동시에 잡는다)
+#   - Postgres : pg_advisory_xact_lock(키) (트랜잭션이 끝나면 자동으로 풀린다)
+# 키는 아무 정수나 괜찮고, 이 앱에서만 쓰는 고정값이면 된다.
+_MIGRATION_LOCK_KEY = 0x5354_4550  # "STEP"
+
+# SQLite 에서 다른 워커가 마이그레이션하는 동안 BEGIN IMMEDIATE 가 기다리는 최대 시간(ms).
+_MIGRATION_BUSY_TIMEOUT_MS = 60_000
+
+
+def _stored_schema_rev(conn: Connection) -> str | None:
+    """
+    meta 테이블에 기록된 스키마 버전. (meta 테이블이 아직 없으면 None)
+    """
+    if not inspect(conn).has_table(models.Meta.__tablename__):
+        return None
+    return conn.execute(
+        text("SELECT value FROM meta WHERE key = 'schema_rev'")
+    ).scalar()
+
+
+@contextmanager
+def _migration_transaction() -> Iterator[Connection]:
+    """
+    마이그레이션 전용 트랜잭션 + 잠금을 잡은 커넥션을 돌려준다.
+
+    - with 블록 안의 DDL/UPDATE/meta 기록이 전부 한 트랜잭션으로 커밋되고,
+      예외가 나면 전부 롤백된다. (SQLite/Postgres 모두 DDL 도 트랜잭션 안에서 동작)
+    - 잠금을 잡은 상태이므로 다른 워커는 이 트랜잭션이 끝날 때까지 기다린다.
+    """
+    if engine.dialect.name == "sqlite":
+        # pysqlite 는 DDL 앞에서는 BEGIN 을 자동으로 걸지 않으므로,
+        # 드라이버의 자동 트랜잭션을 끄고(AUTOCOMMIT) BEGIN IMMEDIATE / COMMIT 을 직접 보낸다.
+        with engine.connect() as conn:
+            conn.execution_options(isolation_level="AUTOCOMMIT")
+            old_timeout = conn.exec_driver_sql("PRAGMA busy_timeout").scalar()
+            conn.exec_driver_sql(f"PRAGMA busy_timeout = {_MIGRATION_BUSY_TIMEOUT_MS}")
+            try:
+                conn.exec_driver_sql("BEGIN IMMEDIATE")
+                try:
+                    yield conn
+                except BaseException:
+                    conn.exec_driver_sql("ROLLBACK")
+                    raise
+                conn.exec_driver_sql("COMMIT")
+            finally:
+                conn.exec_driver_sql(f"PRAGMA busy_timeout = {int(old_timeout)}")
+    else:
+        with engine.begin() as conn:
+            if engine.dialect.name == "postgresql":
+                conn.execute(
+                    text("SELECT pg_advisory_xact_lock(:key)"),
+                    {"key": _MIGRATION_LOCK_KEY},
+                )
+            yield conn
+
+
+def _migrate_schema() -> None:
+    """
+    테이블 생성 + 컬럼/인덱스 보정. (스키마 버전이 바뀐 경우에만 실행)
+
+    전체를 잠금을 잡은 한 트랜잭션(_migration_transaction)에서 실행한다.
+    잠금을 잡은 뒤 schema_rev 를 다시 읽어서, 기다리는 동안 다른 워커가
+    이미 마이그레이션을 끝냈으면 아무것도 하지 않는다.
+
+    1) SQLAlchemy 모델을 기반으로 DB 테이블이 없으면 생성
+    2) schedules.sort_key / diaries.thumbnail_url 컬럼 추가 (+ sort_key 전체 다시 계산)
+    3) 모델에 나중에 추가된 인덱스 생성 / 빠진 인덱스 삭제
+    4) todos 테이블에 sort_index 컬럼이 없으면 추가
+    5) meta.schema_rev 를 SCHEMA_REV 로 기록
+    """
+    with _migration_transaction() as conn:
+        if _stored_schema_rev(conn) == SCHEMA_REV:
+            logger.info(">>> STARTUP: schema_rev %s was migrated by another worker", SCHEMA_REV)
+            return
+
+        logger.info(">>> STARTUP: creating DB tables via Base.metadata.create_all")
+
+        # Base 에 모든 모델이 등록되는 것은 파일 상단의 import models 로 이미 보장된다.
+
+        # Base 에 등록된 모든 모델을 기준으로 테이블 생성
+        #   - 테이블이 이미 있으면 그대로 두고
+        #   - 없으면 새로 만든다
+        Base.metadata.create_all(bind=conn)
+
+        # schedules.sort_key 는 나중에 추가된 컬럼이라 기존 DB 에는 없을 수 있다.
+        # 없으면 추가하고, 모든 행을 저장할 때와 같은 schedule_sort_value() 로 다시 계산한다.
+        #   - SQL 로 date || 'T' || time_str 만 붙이면 "9:00" 이 "10:00" 뒤로 가고,
+        #     "오후" 같은 값이 23:59 로 바뀌지 않아서 정렬이 어긋난다.
+        #   - 예전 마이그레이션이 그렇게 채워 둔 DB 도 고쳐지도록 NULL 인 행만이 아니라 전부 계산한다.
+        schedule_columns = {c["name"] for c in inspect(conn).get_columns("schedules")}
+        if "sort_key" not in schedule_columns:
+            conn.execute(text("ALTER TABLE schedules ADD COLUMN sort_key VARCHAR(40)"))
+        rows = conn.execute(text("SELECT id, date, time_str FROM schedules")).all()
+        if rows:
+            conn.execute(
+                text("UPDATE schedules SET sort_key = :sort_key WHERE id = :id"),
+                [
+                    {"id": row.id, "sort_key": schedule_sort_value(row.date, row.time_str)}
+                    for row in rows
+                ],
+            )
+
+        # diaries.thumbnail_url 도 나중에 추가된 컬럼. (기존 글은 None → 원본 이미지를 그대로 쓴다)
+        diary_columns = {c["name"] for c in inspect(conn).get_columns("diaries")}
+        if "thumbnail_url" not in diary_columns:
+            conn.execute(text("ALTER TABLE diaries ADD COLUMN thumbnail_url VARCHAR(300)"))
+
+        # create_all 은 "이미 있는 테이블"에는 새 인덱스를 추가해 주지 않는다.
+        # 모델에 나중에 추가된 인덱스도 기존 DB 에 생기도록 하나씩 확인해서 만든다.
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
+
+        # 다른 인덱스로 대체되어 모델에서 빠진 인덱스는 기존 DB 에서도 지운다.
+        # (DROP INDEX IF EXISTS 는 Postgres/SQLite 공통 문법)
+        for name in _DROPPED_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+        # ---- 여기서부터 1회성 마이그레이션 ----
+        # todos 테이블에 sort_index 컬럼이 없을 때만 추가한다. (아주 옛날 DB 용)
+        #   - 모델에는 이미 있는 컬럼이라 새로 만든 DB 에는 항상 있다.
+        #   - 예전에는 매번 ALTER TABLE ... IF NOT EXISTS 를 실행해서
+        #     Postgres 에서는 테이블 잠금이 걸리고, SQLite 에서는 문법 에러 로그가 찍혔다.
+        todo_columns = {c["name"] for c in inspect(conn).get_columns("todos")}
+        if "sort_index" not in todo_columns:
+            conn.execute(
+                text("ALTER TABLE todos ADD COLUMN sort_index INTEGER NOT NULL DEFAULT 0")
+            )
+            logger.info(">>> STARTUP: added todos.sort_index column")
+
+        # 마이그레이션을 마친 버전 기록 (DELETE + INSERT 는 Postgres/SQLite 공통 문법)
+        # 위의 변경과 같은 트랜잭션이므로, 중간에 실패하면 버전도 기록되지 않는다.
+        conn.execute(text("DELETE FROM meta WHERE key = 'schema_rev'"))
+        conn.execute(
+            text("INSERT INTO meta (key, value) VALUES ('schema_rev', :rev)"),
+            {"rev": SCHEMA_REV},
+        )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    서버(워커 프로세스)가 시작될 때 한 번만 실행되는 함수.
+    (예전 @app.on_event("startup") 을 FastAPI lifespan 으로 옮긴 것)
+
+    1) (구) SQLite diary_entries 테이블/인덱스 생성 (init_db)
+       - 예전에는 deps.py import 시점에 실행됐지만,
+         스크립트에서 import 만 해도 DB 파일을 건드려서 여기로 옮겼다.
+    2) meta.schema_rev 가 SCHEMA_REV 와 다를 때만 _migrate_schema() 실행
+       - 이미 마이그레이션된 DB 로 재시작할 때는 create_all / ALTER TABLE 을
+         건너뛰어서, 부팅이 빨라지고 Postgres 테이블 잠금도 걸리지 않는다.
+       - 여기서는 잠금 없이 한 번 읽어 보기만 하고, 실제 판단은
+         _migrate_schema() 가 잠금을 잡은 뒤 다시 읽어서 한다.
+    3) 페이지 템플릿 미리 컴파일 (preload_templates)
+
+    종료할 때(yield 이후)는 SQLite 연결 pool 을 PRAGMA optimize 후 닫는다.
+    """
+    init_db()
+
+    with engine.connect() as conn:
+        stored_rev = _stored_schema_rev(conn)
+
+    if stored_rev == SCHEMA_REV:
+        logger.info(">>> STARTUP: schema_rev %s is up to date, skipping migration", SCHEMA_REV)
+    else:
+        _migrate_schema()
+
+    preload_templates()
+
+    yield
+
+    close_pool()
+
+
 # =========================
 # 앱 & 공통 설정
 # =========================
@@ -51,18 +243,70 @@ logger = logging.getLogger("steplog")
 # FastAPI 애플리케이션 생성
 # dependencies=[Depends(require_auth)] :
 #   → 모든 엔드포인트에 require_auth가 자동으로 적용됨 (전역 Basic Auth)
+# default_response_class=ORJSONResponse :
+#   → dict 를 반환하는 JSON API 들이 표준 json 대신 orjson 으로 직렬화된다.
+#     (HTML 화면은 각 라우트에서 response_class=HTMLResponse 로 따로 지정)
 app = FastAPI(
-    dependencies=[Depends(require_auth)]
+    dependencies=[Depends(require_auth)],
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
+
+class _TextGZipMiddleware(GZipMiddleware):
+    """
+    HTML/JSON/CSS 응답을 gzip 으로 압축해서 보낸다. (브라우저가 Accept-Encoding: gzip 을 보낼 때만)
+
+    이미 압축된 데이터가 나가는 경로는 다시 압축해 봐야 CPU 만 쓰므로 건너뛴다.
+    - /uploads : 업로드 이미지(jpg/png 등)
+    - /backup  : ZIP 파일 스트리밍
+    """
+
+    _SKIP_PREFIXES = ("/uploads/", "/backup/")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].startswith(self._SKIP_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+# - minimum_size=1024 : 1KB 미만의 작은 응답은 압축하지 않는다.
+# - compresslevel=5   : 압축률과 CPU 사용량의 중간값
+app.add_middleware(_TextGZipMiddleware, minimum_size=1024, compresslevel=5)
+
+
+class _UploadFiles(StaticFiles):
+    """
+    /uploads 용 StaticFiles.
+
+    업로드 이미지는 내용의 sha256 해시를 파일 이름으로 저장한다. (uploads/ab/<sha256>.<확장자>)
+    같은 URL 이면 항상 같은 내용이고, 내용이 다르면 URL 도 달라지므로
+    브라우저가 오래 캐시해도 옛날 이미지가 보일 일이 없다.
+    (썸네일 <sha256>_thumb.webp 도 원본 해시에서 정해지므로 마찬가지)
+    - private : 로그인한 본인 브라우저에만 캐시 (공유 프록시/CDN 에는 저장하지 않음)
+    - max-age=604800 : 7일 동안은 서버에 다시 묻지 않는다.
+
+    운영에서 Nginx 등 리버스 프록시를 앞에 둔다면 /uploads/ 를 프록시에서
+    sendfile 로 바로 내보내는 편이 더 빠르다. (그때도 인증은 프록시에서 걸어야 한다)
+    """
+
+    async def get_response(self, path, scope):
+        response = await super().get_response(path, scope)
+        if response.status_code in (200, 304):
+            response.headers["Cache-Control"] = "private, max-age=604800"
+        return response
+
+
 # 정적 파일(이미지, CSS 등) 제공 설정
 # /uploads/ 경로로 들어온 요청은 UPLOAD_DIR 디렉터리에서 파일을 찾아서 응답
-app.mount("/uploads", StaticFiles(directory=UPLOAD_DIR), name="uploads")
+app.mount("/uploads", _UploadFiles(directory=UPLOAD_DIR), name="uploads")
 # /static/ 경로로 들어온 요청은 STATIC_DIR 디렉터리에서 파일을 제공
 app.mount("/static",  StaticFiles(directory=STATIC_DIR),  name="static")
 
 # 기능별 라우터 등록
 # 각 라우터 안에 /diary, /schedule 같은 실제 엔드포인트들이 정의되어 있음
+app.include_router(dashboard_router)
 app.include_router(diary_router)
 app.include_router(schedule_router)
 app.include_router(todos_router)
@@ -71,143 +315,28 @@ app.include_router(backup_router)
 app.include_router(restore_router)
 
 
-# =========================
-# 앱 시작 시: 테이블 자동 생성 + 컬럼 보정
-# =========================
-@app.on_event("startup")
-async def on_startup():
-    """
-    서버가 시작될 때 한 번만 실행되는 함수.
-
-    1) SQLAlchemy 모델을 기반으로 DB 테이블이 없으면 생성
-    2) todos 테이블에 sort_index 컬럼이 없으면 추가 (Postgres 기준)
-    """
-    logger.info(">>> STARTUP: creating DB tables via Base.metadata.create_all")
-
-    # models 를 import 해서, Base에 모든 모델이 등록되도록 보장
-    # (위에서 이미 import models를 했기 때문에 사실상 한 번 더 호출하는 셈이지만,
-    #  import 는 한 번만 실제로 동작하고 이후에는 캐시를 사용하므로 성능 문제는 거의 없음)
-    import models
-
-    # Base 에 등록된 모든 모델을 기준으로 테이블 생성
-    #   - 테이블이 이미 있으면 그대로 두고
-    #   - 없으면 새로 만든다
-    Base.metadata.create_all(bind=engine)
-
-    # ---- 여기서부터 1회성 마이그레이션 ----
-    # Postgres 의 todos 테이블에 sort_index 컬럼이 없으면 추가하는 SQL
-    #   - Render(Postgres) 에서는 정상 동작
-    #   - 로컬 SQLite 에서는 IF NOT EXISTS 문법 때문에 에러 로그가 찍히지만,
-    #     아래 try/except 로 인해 앱 전체는 계속 실행된다.
-    try:
-        with engine.begin() as conn:
-            conn.execute(
-                text(
-                    "ALTER TABLE todos "
-                    "ADD COLUMN IF NOT EXISTS sort_index INTEGER"
-                )
-            )
-        logger.info(">>> STARTUP: ensured todos.sort_index column exists")
-    except Exception as e:
-        # 컬럼 추가에 실패해도 서버가 죽지 않도록 에러만 로그에 남긴다.
-        logger.error(">>> STARTUP: failed to ensure todos.sort_index: %s", e)
-
-
-# =========================
-# 메인 대시보드 ("/")
-# =========================
-@app.get("/", response_class=HTMLResponse, name="home")
-async def dashboard(request: Request):
-    """
-    메인 대시보드 페이지 핸들러.
-
-    1) 오늘 날짜 기준으로
-       - 향후 15일 이내 일정(upcoming)
-       - 진행 중인 TODO 목록
-       - 이번 달 달력 정보
-      를 만들어서 dashboard.html 템플릿에 넘겨준다.
-    """
-    # 오늘 날짜 (date 객체)
-    today = date.today()
-    # "YYYY-MM-DD" 형태의 문자열로도 준비 (비교/템플릿용)
-    today_str = today.isoformat()
-
-    # ---- 일정 불러오기 ----
-    schedule_items = load_schedule()
-
-    # 오늘부터 15일 뒤까지를 보여줄 범위로 설정
-    horizon = today + timedelta(days=15)
-
-    # 오늘 ~ 15일 뒤까지의 일정만 필터링
-    upcoming = [
-        item for item in schedule_items
-        if today_str <= item.date <= horizon.isoformat()
-    ]
-
-    # 정렬 기준 함수(schedule_sort_key)를 사용해서 일정 정렬
-    upcoming_sorted = sorted(upcoming, key=schedule_sort_key)
-
-    # ---- 오늘 TODO 목록 (진행 중인 것만) ----
-    todos = load_todos()
-    # status == "pending" 인 TODO만 오늘 보여준다
-    today_todos = [t for t in todos if t.status == "pending"]
-
-    # ---- 달력 데이터 생성 ----
-    # firstweekday=6 → 일요일(6)부터 한 주를 시작하겠다는 의미
-    cal = calendar.Calendar(firstweekday=6)
-    weeks = []
-
-    # monthdatescalendar(year, month):
-    #   → 해당 월을 주(week) 단위로 끊어서, 각 주마다 7개의 date 객체 리스트를 반환
-    for week in cal.monthdatescalendar(today.year, today.month):
-        week_data = []
-        for d in week:
-            key = d.isoformat()
-            week_data.append({
-                "day": d.day,                          # 일(1~31)
-                "in_month": (d.month == today.month),  # 이번 달에 속하는 날짜인지 여부
-                "has_schedule": any(                   # 해당 날짜에 일정이 있는지 여부
-                    it.date == key for it in schedule_items
-                ),
-                "is_today": (d == today),              # 오늘 날짜인지 여부
-            })
-        weeks.append(week_data)
-
-    # === 수정: 아래 로그는 개발 중 디버깅용이라, 실제 서비스 운영에는 필수는 아님.
-    # 필요할 때만 잠깐 주석을 풀어 사용해도 된다.
-    # logger.info(
-    #     "DASHBOARD_DEBUG: schedules_total=%d upcoming_shown=%d "
-    #     "todos_total=%d pending_shown=%d",
-    #     len(schedule_items),
-    #     len(upcoming_sorted),
-    #     len(todos),
-    #     len(today_todos),
-    # )
-
-    # 템플릿에 데이터를 넘겨서 HTML을 렌더링
-    return templates.TemplateResponse(
-        "dashboard.html",
-        {
-            "request": request,
-            "year": today.year,
-            "month": today.month,
-            "weeks": weeks,
-            "upcoming_items": upcoming_sorted,
-            "today_todos": today_todos,
-            "today_str": today_str,
-        },
-    )
-
-
 # 이 블록은 "python main.py" 로 직접 실행했을 때만 동작한다.
 # Render 같은 환경에서는 보통 "uvicorn main:app" 명령으로 실행하므로,
 # 여기 코드는 실행되지 않는다. (그래도 로컬 테스트용으로 남겨두는 것이 보통이다.)
+#
+# 환경변수로 실행 방식을 고른다.
+#   - PORT            : 포트 (기본 8000)
+#   - RELOAD=1        : 코드 수정 시 자동 재시작 (로컬 개발용, 워커 1개로 고정)
+#   - WEB_CONCURRENCY : 워커 프로세스 수 (기본 1, RELOAD 가 꺼져 있을 때만 적용)
+# loop/http 는 "auto" : uvicorn[standard] 로 설치된 uvloop / httptools 가 있으면 그걸 쓰고,
+#   (uvloop 이 없는 Windows 등에서는) 기본 asyncio / h11 로 동작한다.
 if __name__ == "__main__":
+    import os
     import uvicorn
 
+    reload = os.getenv("RELOAD", "0") == "1"
+
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
-        port=8000,
-        reload=True,
+        port=int(os.getenv("PORT", "8000")),
+        reload=reload,
+        workers=1 if reload else int(os.getenv("WEB_CONCURRENCY", "1")),
+        loop="auto",
+        http="auto",
     )
@@ -9,21 +9,46 @@
 
 from datetime import datetime
 
-from deps import load_all_entries, _parse_tags  # SQLite 기반 JSON/일기 불러오기 함수
+from sqlalchemy import insert
+
+from deps import init_db, iter_all_entries, _parse_tags  # SQLite 기반 JSON/일기 불러오기 함수
 from db import SessionLocal                     # SQLAlchemy DB 세션
 from models import Diary                        # SQLAlchemy Diary 모델
 
 
+# 한 번에 INSERT 할 행 수 (executemany 한 번에 넘기는 묶음 크기)
+BATCH_SIZE = 1000
+
+
+def _flush(session, rows: list[dict]) -> None:
+    """
+    모아 둔 rows 를 INSERT 한 번(executemany)으로 저장하고 비운다.
+    (ORM 객체를 만들어 session.add 하지 않고 Core insert 로 바로 넣는다)
+    """
+    if rows:
+        session.execute(insert(Diary), rows)
+        rows.clear()
+
+
 def main():
+    # diary_entries 테이블이 없으면 만들어 둔다. (앱 밖에서 단독 실행하므로 직접 호출)
+    init_db()
+
     # SQLAlchemy 세션 생성
     session = SessionLocal()
 
-    # SQLite 기반 diary_entries 테이블에서 모든 일기 로드
-    entries = load_all_entries()
-    print(f"총 {len(entries)}개의 JSON 일기를 DB로 옮깁니다.")
+    # SQLite 기반 diary_entries 테이블의 일기를 조금씩 끊어서 읽는다.
+    # (전체를 리스트로 한 번에 올리지 않는다)
+    entries = iter_all_entries()
+    print("JSON 일기를 DB로 옮깁니다.")
 
     migrated = 0  # 실제 저장된 일기 개수
 
+    # executemany 는 한 묶음 안의 행들이 같은 컬럼을 가져야 하므로
+    # created_at 이 있는 행 / 없는 행(DB default now() 사용)을 따로 모은다.
+    rows_with_created: list[dict] = []
+    rows_without_created: list[dict] = []
+
     try:
         for data in entries:
             # JSON 에서 필요한 필드를 꺼낸다.
@@ -52,23 +77,29 @@ def main():
                     # 형식이 다르면 그냥 None → DB now() 사용
                     created_at = None
 
-            # Diary ORM 객체 생성
-            diary = Diary(
-                title=title,
-                content=content,
-                image_url=image_url,
-                tags=tags_str,
-            )
+            row = {
+                "title": title,
+                "content": content,
+                "image_url": image_url,
+                "tags": tags_str,
+            }
 
             # created_at 값을 DB default(now()) 대신 기존 데이터로 덮어쓰기
             if created_at is not None:
-                diary.created_at = created_at
+                row["created_at"] = created_at
+                rows_with_created.append(row)
+                if len(rows_with_created) >= BATCH_SIZE:
+                    _flush(session, rows_with_created)
+            else:
+                rows_without_created.append(row)
+                if len(rows_without_created) >= BATCH_SIZE:
+                    _flush(session, rows_without_created)
 
-            # 세션에 추가
-            session.add(diary)
             migrated += 1
 
-        # 전부 성공하면 commit
+        # 남은 행 저장 후, 전부 성공하면 commit
+        _flush(session, rows_with_created)
+        _flush(session, rows_without_created)
         session.commit()
         print(f"✅ 마이그레이션 완료: {migrated}개 일기 DB에 저장됨.")
 
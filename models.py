@@ -5,7 +5,7 @@
 # 이를 통해 DB의 레코드를 파이썬 객체처럼 다룰 수 있게 된다.
 # ----------------------------------------------
 
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, Index
 from sqlalchemy.sql import func
 
 from db import Base  # SQLAlchemy Base (모델 등록용)
@@ -40,9 +40,18 @@ class Diary(Base):
     # 업로드된 이미지 URL
     image_url = Column(String(300), nullable=True)
 
+    # 목록(갤러리)용 작은 WebP 썸네일 URL (Pillow 가 없거나 만들 수 없는 이미지면 None)
+    thumbnail_url = Column(String(300), nullable=True)
+
     # 생성 시각 (서버가 자동으로 now() 넣어줌)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        # /diary 목록의 기간 필터(created_at 범위) + ORDER BY created_at DESC 용
+        # (오름차순 인덱스도 SQLite/Postgres 모두 역방향으로 읽을 수 있어서 DESC 정렬에 그대로 쓰인다)
+        Index("ix_diary_created_at", "created_at"),
+    )
+
 
 # ==========================================================
 # Schedule 모델
@@ -76,6 +85,18 @@ class Schedule(Base):
     # 일정 완료 여부 (현재 앱에서는 사실상 거의 사용하지 않는 필드)
     done = Column(Boolean, default=False)
 
+    # 정렬용 키: "YYYY-MM-DDTHH:MM" (시간 없으면 "YYYY-MM-DDT")
+    # 저장할 때 deps.schedule_sort_value() 로 계산해서 넣어 둔다.
+    sort_key = Column(String(40), nullable=True)
+
+    __table_args__ = (
+        # 날짜 범위 조회(/schedule: WHERE date >= ? ORDER BY date, title) 용
+        # (예전 ix_schedule_date_time(date, time_str) 을 대신한다. main._migrate_schema 에서 삭제)
+        Index("ix_schedule_date_title", "date", "title"),
+        # load_schedule 의 ORDER BY sort_key, title 용
+        Index("ix_schedule_sort", "sort_key", "title"),
+    )
+
 
 # ==========================================================
 # Todo 모델
@@ -111,3 +132,30 @@ class Todo(Base):
     #           (주석만 추가했으며 기능은 그대로 유지)
     # ❗ 실제 정렬은 order 컬럼에서 관리한다.
     sort_index = Column(Integer, nullable=False, default=0)  # ← 현재 앱에서는 사용되지 않음
+
+    __table_args__ = (
+        # load_todos 의 ORDER BY date, order, id 를 정렬 없이 인덱스 순서대로 읽기 위한 인덱스
+        Index("ix_todos_date_order_id", "date", "order", "id"),
+        # /todos 의 진행 중 목록(WHERE status='pending' ORDER BY order, date)과
+        # 새 항목 추가 시 MAX(order) 조회용 인덱스
+        Index("ix_todos_status_order_date", "status", "order", "date"),
+        # /todos 히스토리(WHERE status IN ('done','giveup') AND date 범위 ORDER BY date DESC, id DESC)와
+        # /stats 의 기간별 GROUP BY status 용
+        Index("ix_todos_status_date_id", "status", "date", "id"),
+    )
+
+
+# ==========================================================
+# Meta 모델 (앱 내부 설정값 보관용 key/value)
+# ==========================================================
+class Meta(Base):
+    """
+    앱이 스스로 관리하는 key/value 값 테이블.
+
+    - "schema_rev": 시작 시 마이그레이션을 마친 스키마 버전 (main.SCHEMA_REV 참고)
+    """
+
+    __tablename__ = "meta"
+
+    key = Column(String(50), primary_key=True)
+    value = Column(String(200), nullable=True)
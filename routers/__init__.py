@@ -12,6 +12,9 @@
 # 이게 가능한 이유가 바로 이 __init__.py 파일 때문이다.
 # -----------------------------------------------------------
 
+# 메인 대시보드 라우터 (/)
+from .dashboard import router as dashboard_router
+
 # 일기 기능 라우터 (/diary 이하)
 from .diary import router as diary_router
 
@@ -11,19 +11,25 @@
 # 이 ZIP 파일은 복원 스크립트로 다시 읽어올 수 있다.
 # ---------------------------------------------------------------
 
+import hashlib
 import io
-import json
+import os
+import stat
+import tempfile
 import zipfile
 from pathlib import Path
+from typing import Iterator
 from datetime import datetime, timezone, timedelta
 
+import orjson
 from fastapi import APIRouter, Depends
-from fastapi.responses import StreamingResponse
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from db import get_db
 from models import Diary, Schedule, Todo
-from deps import UPLOAD_DIR  # 업로드 이미지 폴더 경로
+from deps import DATA_DIR, UPLOAD_DIR  # 데이터 폴더 / 업로드 이미지 폴더 경로
 
 router = APIRouter()
 
@@ -32,77 +38,294 @@ KST = timezone(timedelta(hours=9))
 
 
 # ============================================================
-# 개별 테이블(Row) → JSON Friendly dict 형태로 변환하는 함수들
+# 테이블별 백업 컬럼 (JSON 키 순서 = 이 순서)
 # ============================================================
+# ORM 객체를 만들지 않고 필요한 컬럼만 Row 로 받아서 바로 dict 로 만든다.
+# (datetime 은 orjson 이 ISO 8601 문자열로 바로 직렬화한다.)
 
-def _serialize_diary(row: Diary) -> dict:
-    """Diary ORM 객체를 백업용 dict 로 변환"""
-    return {
-        "id": row.id,
-        "title": row.title,
-        "content": row.content,
-        "image_url": row.image_url,
-        "tags": row.tags,
-        "created_at": row.created_at.isoformat() if row.created_at else None,
-
-        # === 수정: getattr(row, "updated_at", None) 은 Diary 모델에 updated_at 이 없기 때문에
-        #           항상 None 이 되므로 '현재는 사용되지 않는 필드' 라는 설명 주석만 추가.
-        #           기능 변화는 없음.
-        "updated_at": row.created_at.isoformat() if hasattr(row, "updated_at") else None,
-    }
+_DIARY_COLUMNS = (
+    Diary.id,
+    Diary.title,
+    Diary.content,
+    Diary.image_url,
+    Diary.thumbnail_url,
+    Diary.tags,
+    Diary.created_at,
+)
 
+_SCHEDULE_COLUMNS = (
+    Schedule.id,
+    Schedule.date,
+    Schedule.title,
+    Schedule.memo,
+    Schedule.time_str,
+    Schedule.place,
+    Schedule.done,
+)
 
-def _serialize_schedule(row: Schedule) -> dict:
-    """Schedule ORM 객체 → dict"""
-    return {
-        "id": row.id,
-        "date": row.date,
-        "title": row.title,
-        "memo": row.memo,
-        "time_str": row.time_str,
-        "place": row.place,
-        "done": row.done,
-    }
+_TODO_COLUMNS = (
+    Todo.id,
+    Todo.date,
+    Todo.title,
+    Todo.status,
+    Todo.order,    # 순서 정보가 중요한 필드
+)
 
 
-def _serialize_todo(row: Todo) -> dict:
-    """Todo ORM 객체 → dict"""
-    return {
-        "id": row.id,
-        "date": row.date,
-        "title": row.title,
-        "status": row.status,
-        "order": row.order,    # 순서 정보가 중요한 필드
-    }
+def _select_dicts(db: Session, columns: tuple) -> list[dict]:
+    """
+    columns 만 SELECT 해서 {컬럼 이름: 값} dict 리스트로 돌려준다.
+    """
+    return [dict(m) for m in db.execute(select(*columns)).mappings()]
 
 
 # ============================================================
-# 메인 백업 API 엔드포인트
+# ZIP 스트리밍
 # ============================================================
-@router.get("/backup/db")
-async def backup_db(db: Session = Depends(get_db)):
+
+# 기본 deflate 압축 레벨.
+# 백업은 요청할 때마다 즉석에서 만드는 것이라 속도가 더 중요하다.
+# (레벨 1 은 기본값 6 보다 훨씬 빠르고, JSON 크기 차이는 크지 않다)
+DEFAULT_COMPRESS_LEVEL = 1
+
+# 업로드 파일을 읽어서 ZIP 에 넣을 때 한 번에 읽는 크기
+_CHUNK_SIZE = 64 * 1024
+
+# 이미 압축된 형식이라 deflate 해도 거의 줄지 않는 확장자들
+# → CPU 만 쓰고 크기 이득이 없으므로 압축 없이(ZIP_STORED) 그대로 넣는다.
+_STORED_SUFFIXES = frozenset({
+    ".jpg", ".jpeg", ".png", ".gif", ".webp", ".heic",
+    ".mp4", ".mov", ".zip", ".gz",
+})
+
+
+class _ZipStreamBuffer(io.RawIOBase):
     """
-    StepLog 전체 데이터를 ZIP 파일로 만들어 다운로드하는 기능.
+    zipfile 이 쓰는 바이트를 잠깐 모아 두는 "되감기 불가능한" 파일 객체.
+
+    - seek/tell 을 지원하지 않으므로 zipfile 이 스트리밍 모드
+      (각 파일 뒤에 data descriptor 를 붙이는 방식)로 ZIP 을 쓴다.
+    - pop() 으로 지금까지 쌓인 바이트를 꺼내서 응답으로 내보낸다.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def pop(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _iter_upload_files(root: str | Path, prefix: str = "") -> Iterator[tuple[str, str]]:
+    """
+    root 아래 모든 파일의 (실제 경로, root 기준 상대 경로 "ab/abcd.jpg") 를 돌려준다.
+
+    rglob + is_file() 은 항목마다 stat 을 한 번 더 부르지만,
+    os.scandir 의 DirEntry 는 디렉터리를 읽을 때 받은 파일 종류를 그대로 쓰므로
+    대부분의 OS 에서 추가 stat 없이 파일/폴더를 구분한다.
+    - 업로드 중인 임시 파일(*.part)은 건너뛴다. (routers/diary.py _store_upload 참고)
+    """
+    with os.scandir(root) as it:
+        for entry in it:
+            rel = prefix + entry.name
+            if entry.is_dir(follow_symlinks=False):
+                yield from _iter_upload_files(entry.path, rel + "/")
+            elif entry.is_file() and not entry.name.endswith(".part"):
+                yield entry.path, rel
+
+
+def _set_compress_level(zinfo: zipfile.ZipInfo, level: int) -> None:
+    """
+    ZipInfo 한 개의 deflate 압축 레벨을 지정한다.
+
+    - Python 3.13 부터는 compress_level 이라는 이름을 쓰고,
+      그 전 버전에는 _compresslevel 만 있다. (ZipInfo 는 __slots__ 라서 없는 이름은 못 쓴다)
+    - 있는 이름에 모두 넣어서 어느 버전에서도 ?level= 값이 적용되게 한다.
+    """
+    for attr in ("compress_level", "_compresslevel"):
+        if hasattr(zinfo, attr):
+            setattr(zinfo, attr, level)
+
+
+def _iter_backup_zip(
+    json_name: str,
+    json_bytes: bytes,
+    upload_files: list[tuple[str, str]],
+    level: int = DEFAULT_COMPRESS_LEVEL,
+) -> Iterator[bytes]:
+    """
+    백업 ZIP 을 만들면서 완성된 부분부터 바로 돌려주는 제너레이터.
+    (StreamingResponse 가 스레드풀에서 돌리므로 파일 I/O 가 이벤트 루프를 막지 않는다)
+
+    - upload_files : _iter_upload_files 로 모은 (실제 경로, 상대 경로) 목록
+    - level : deflate 압축 레벨 (0~9, 작을수록 빠르고 클수록 작다)
 
     ZIP 내부 구성:
         /steplog_backup_YYYYMMDD.json   → DB 전체 데이터
         /uploads/...                    → 이미지 파일들
     """
+    buf = _ZipStreamBuffer()
+
+    with zipfile.ZipFile(
+        buf, mode="w", compression=zipfile.ZIP_DEFLATED, compresslevel=level
+    ) as zf:
 
-    # DB 전체 조회 (Diary / Schedule / Todo)
-    diaries = db.query(Diary).all()
-    schedules = db.query(Schedule).all()
-    todos = db.query(Todo).all()
+        # 1) JSON 파일 추가
+        zf.writestr(json_name, json_bytes)
+        yield buf.pop()
+
+        # 2) /uploads 폴더에 있는 이미지 파일들 백업
+        for path, rel_path in upload_files:
+            # ZIP 파일 안에서의 위치 예: uploads/image123.png
+            zinfo = zipfile.ZipInfo.from_file(path, arcname=f"uploads/{rel_path}")
+            if os.path.splitext(path)[1].lower() in _STORED_SUFFIXES:
+                zinfo.compress_type = zipfile.ZIP_STORED
+            else:
+                zinfo.compress_type = zipfile.ZIP_DEFLATED
+                # ZipInfo 를 직접 만들면 ZipFile 의 compresslevel 이 적용되지 않아서 따로 지정
+                _set_compress_level(zinfo, level)
+
+            # 큰 파일도 _CHUNK_SIZE 씩 읽어서 압축한 만큼 바로 내보낸다.
+            with open(path, "rb") as src, zf.open(zinfo, mode="w") as dest:
+                while chunk := src.read(_CHUNK_SIZE):
+                    dest.write(chunk)
+                    data = buf.pop()
+                    if data:
+                        yield data
+            yield buf.pop()
+
+    # ZIP 끝부분(central directory)
+    yield buf.pop()
+
+
+# ============================================================
+# 백업 ZIP 디스크 캐시
+# ============================================================
+# 데이터가 그대로인데 백업을 여러 번 받으면 매번 ZIP 을 다시 만들 필요가 없다.
+# 마지막으로 만든 ZIP 을 data/backup_cache 에 한 개만 남겨 두고,
+# 캐시 키(JSON 내용 + 업로드 파일 목록/크기/수정 시각 + 압축 레벨)가 같으면
+# FileResponse 로 바로 보낸다. (Linux 에서는 sendfile 로 전송)
+#   - 캐시 파일은 개인 데이터 전체가 든 아카이브라서, 다른 사용자도 쓰는 공용 임시 폴더(/tmp)가
+#     아니라 DB 와 같은 앱 데이터 폴더(DATA_DIR) 아래에 둔다.
+#   - 쓰기 전에 폴더가 "심볼릭 링크가 아닌 진짜 폴더 + 본인 소유 + 권한 0o700" 인지 확인하고,
+#     아니면 캐시를 쓰지 않고 스트리밍만 한다. (_backup_cache_dir_ok)
+#   - 워커가 여러 개여도 같은 폴더를 보므로 캐시를 같이 쓴다.
+_BACKUP_CACHE_DIR = DATA_DIR / "backup_cache"
+
+
+def _backup_cache_dir_ok() -> bool:
+    """
+    캐시 폴더를 만들고(없으면), 안전하게 쓸 수 있는 폴더인지 확인한다.
+
+    - mkdir(mode=0o700, exist_ok=True) 는 이미 있는 폴더의 소유자/권한을 바꾸지 않으므로
+      lstat 으로 직접 확인한다.
+    - 본인 소유 폴더인데 권한만 넓으면 0o700 으로 좁혀서 쓴다.
+    - 심볼릭 링크이거나 다른 사용자 소유면 False (→ 캐시 없이 스트리밍)
+    """
+    try:
+        _BACKUP_CACHE_DIR.mkdir(mode=0o700, exist_ok=True)
+        st = os.lstat(_BACKUP_CACHE_DIR)
+        if not stat.S_ISDIR(st.st_mode):
+            return False
+        if hasattr(os, "getuid") and st.st_uid != os.getuid():
+            return False
+        if stat.S_IMODE(st.st_mode) != 0o700:
+            os.chmod(_BACKUP_CACHE_DIR, 0o700)
+    except OSError:
+        return False
+    return True
+
+
+def _backup_cache_key(
+    json_bytes: bytes,
+    upload_files: list[tuple[str, str]],
+    level: int,
+) -> str:
+    """
+    백업 ZIP 내용이 달라지는 모든 입력으로 만든 해시.
+    업로드 파일은 내용을 읽지 않고 이름/크기/수정 시각(stat)만 본다.
+    """
+    h = hashlib.blake2b(json_bytes, digest_size=16)
+    h.update(b"level=%d\n" % level)
+    for path, rel_path in upload_files:
+        st = os.stat(path)
+        h.update(f"{rel_path}\0{st.st_size}\0{st.st_mtime_ns}\n".encode())
+    return h.hexdigest()
+
+
+def _tee_to_cache(chunks: Iterator[bytes], cache_path: Path) -> Iterator[bytes]:
+    """
+    chunks 를 그대로 흘려보내면서 같은 바이트를 cache_path 에도 쓴다.
+
+    - 임시 파일에 쓰다가 ZIP 이 끝까지 만들어졌을 때만 cache_path 로 옮긴다.
+      (다운로드가 중간에 끊기면 반쯤 쓴 파일은 지운다)
+    - 새 캐시가 생기면 예전 캐시 파일은 지운다. (항상 최신 한 개만 유지)
+    """
+    # (폴더 검사는 backup_db 에서 _backup_cache_dir_ok() 로 이미 했다)
+    fd, tmp_name = tempfile.mkstemp(dir=_BACKUP_CACHE_DIR, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            for chunk in chunks:
+                out.write(chunk)
+                yield chunk
+        os.replace(tmp_name, cache_path)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+        raise
+
+    for old in _BACKUP_CACHE_DIR.glob("*.zip"):
+        if old != cache_path:
+            old.unlink(missing_ok=True)
+
+
+# ============================================================
+# 메인 백업 API 엔드포인트
+# ============================================================
+@router.get("/backup/db")
+def backup_db(
+    level: int = DEFAULT_COMPRESS_LEVEL,   # deflate 압축 레벨 (?level=0~9)
+    pretty: bool = False,                  # ?pretty=1 이면 JSON 을 들여쓰기해서 저장
+    db: Session = Depends(get_db),
+):
+    """
+    StepLog 전체 데이터를 ZIP 파일로 만들어 다운로드하는 기능.
+
+    - DB 조회와 JSON 직렬화는 여기서 끝내고,
+      ZIP 은 _iter_backup_zip 이 만들면서 바로 스트리밍한다.
+    - 동기 DB 조회를 하므로 def 로 두어 스레드풀에서 실행되게 한다.
+    """
+
+    # 압축 레벨은 zlib 이 지원하는 0~9 범위로 맞춘다.
+    level = max(0, min(level, 9))
+
+    # DB 전체 조회 (Diary / Schedule / Todo) → 바로 dict 리스트
+    diaries = _select_dicts(db, _DIARY_COLUMNS)
+    for d in diaries:
+        # Diary 모델에는 updated_at 이 없어서 항상 None (예전 백업 형식 호환용 키)
+        d["updated_at"] = None
 
     # Python dict 구조로 백업 데이터 구성
     data = {
-        "diaries": [_serialize_diary(d) for d in diaries],
-        "schedules": [_serialize_schedule(s) for s in schedules],
-        "todos": [_serialize_todo(t) for t in todos],
+        "diaries": diaries,
+        "schedules": _select_dicts(db, _SCHEDULE_COLUMNS),
+        "todos": _select_dicts(db, _TODO_COLUMNS),
     }
 
     # JSON → bytes 로 인코딩
-    json_bytes = json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+    # (orjson 은 바로 UTF-8 bytes 를 만들고 한글도 이스케이프하지 않는다.)
+    # 기본은 공백 없는 compact JSON: 들여쓰기 공백만큼 ZIP 이 압축할 양이 줄어든다.
+    # 사람이 직접 열어 볼 백업이 필요하면 ?pretty=1 로 받는다.
+    json_bytes = orjson.dumps(data, option=orjson.OPT_INDENT_2 if pretty else None)
 
     # ---------------------------------------------------------
     # 날짜 기반으로 파일명 생성 (YYYYMMDD)
@@ -111,31 +334,27 @@ async def backup_db(db: Session = Depends(get_db)):
     json_name = f"steplog_backup_{today_str}.json"
     zip_name = f"steplog_backup_{today_str}.zip"
 
-    # 메모리 상에서 ZIP 파일 생성
-    mem_file = io.BytesIO()
+    # 업로드 파일 목록은 캐시 키 계산과 ZIP 만들기에 같이 쓰도록 한 번만 모은다.
+    upload_dir: Path = UPLOAD_DIR
+    upload_files = list(_iter_upload_files(upload_dir)) if upload_dir.exists() else []
 
-    # ZIP 파일 쓰기
-    with zipfile.ZipFile(mem_file, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
+    # ZIP 을 통째로 만든 뒤 보내지 않고, 만들어지는 대로 조금씩 내려보낸다.
+    # (첫 바이트가 바로 나가고, 업로드 폴더 전체를 메모리에 올리지 않는다.)
+    chunks = _iter_backup_zip(json_name, json_bytes, upload_files, level)
 
-        # 1) JSON 파일 추가
-        zf.writestr(json_name, json_bytes)
+    # 캐시 폴더를 안전하게 쓸 수 있을 때만 캐시를 쓴다.
+    if _backup_cache_dir_ok():
+        # 데이터가 지난번 백업과 같으면 만들어 둔 ZIP 을 그대로 보낸다.
+        cache_key = _backup_cache_key(json_name.encode() + json_bytes, upload_files, level)
+        cache_path = _BACKUP_CACHE_DIR / f"steplog_{cache_key}.zip"
+        if cache_path.is_file():
+            return FileResponse(cache_path, media_type="application/zip", filename=zip_name)
+
+        # 보내는 동안 같은 내용을 캐시 파일로도 남긴다.
+        chunks = _tee_to_cache(chunks, cache_path)
 
-        # 2) /uploads 폴더에 있는 이미지 파일들 백업
-        upload_dir: Path = UPLOAD_DIR
-        if upload_dir.exists():
-            for path in upload_dir.rglob("*"):
-                if path.is_file():
-                    # ZIP 파일 안에서의 위치 예: uploads/image123.png
-                    rel_path = path.relative_to(upload_dir)
-                    arcname = f"uploads/{rel_path.as_posix()}"
-                    zf.write(path, arcname=arcname)
-
-    # ZIP 파일을 처음 위치로 돌려놓기
-    mem_file.seek(0)
-
-    # 파일 다운로드 응답
     return StreamingResponse(
-        mem_file,
+        chunks,
         media_type="application/zip",
         headers={
             "Content-Disposition": f'attachment; filename="{zip_name}"'
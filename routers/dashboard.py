@@ -0,0 +1,177 @@
+# routers/dashboard.py
+# ---------------------------------------------------------
+# 메인 대시보드("/") 라우터.
+#
+# 화면 구성:
+#   1) 다가오는 일정 (오늘 ~ 15일 뒤)
+#   2) 진행 중인 체크리스트
+#   3) 이번 달 달력 (일정 있는 날 표시)
+#
+# 예전에는 main.py 안에 있었지만, main.py 는 앱 생성/설정만 하고
+# 화면별 기능은 다른 라우터들처럼 routers/ 아래에 둔다.
+# ---------------------------------------------------------
+
+from datetime import date, timedelta
+from functools import lru_cache
+import calendar
+
+from fastapi import APIRouter, Request, Depends
+from fastapi.responses import HTMLResponse, Response
+from sqlalchemy.orm import Session
+
+from deps import (
+    DASHBOARD_UPCOMING_LIMIT,  # '다가오는 일정' 최대 표시 개수
+    load_schedule_between,  # 기간 내 일정 목록을 불러오는 함수
+    load_schedule_dates,    # 기간 내 일정이 있는 날짜 집합
+    load_todos,             # TODO 목록을 불러오는 함수
+    render_page,            # 템플릿 렌더링 (미리 컴파일해 둔 템플릿 사용)
+    get_today,              # (오늘 date, "YYYY-MM-DD") 의존성
+    weak_etag,              # 내용 해시로 만든 약한 ETag
+    etag_matches,           # If-None-Match 비교 (→ 304)
+)
+from db import get_db
+
+# 이 파일에서 사용할 라우터 객체 생성
+router = APIRouter()
+
+
+# =========================
+# 달력 뼈대 (월별 캐시)
+# =========================
+@lru_cache(maxsize=4)
+def _month_skeleton(year: int, month: int) -> tuple[tuple[tuple[int, str, bool], ...], ...]:
+    """
+    해당 월 달력의 "모양"만 미리 만들어 둔다. (일요일 시작)
+
+    - 주(week)마다 7칸, 각 칸은 (일, "YYYY-MM-DD", 이번 달 여부) 튜플
+    - 일정 유무/오늘 여부처럼 요청마다 바뀌는 값은 넣지 않는다.
+    - 같은 달 안에서는 요청마다 date 객체 / isoformat() 을 다시 만들지 않는다.
+      (캐시 값이 바뀌지 않도록 튜플로 돌려준다.)
+    """
+    # firstweekday=6 → 일요일(6)부터 한 주를 시작하겠다는 의미
+    cal = calendar.Calendar(firstweekday=6)
+    # monthdatescalendar(year, month):
+    #   → 해당 월을 주(week) 단위로 끊어서, 각 주마다 7개의 date 객체 리스트를 반환
+    return tuple(
+        tuple((d.day, d.isoformat(), d.month == month) for d in week)
+        for week in cal.monthdatescalendar(year, month)
+    )
+
+
+@lru_cache(maxsize=8)
+def _build_weeks(
+    year: int,
+    month: int,
+    today_str: str,
+    schedule_dates: frozenset[str],
+) -> list[list[dict]]:
+    """
+    dashboard.html 에 넘길 달력 데이터(주 → 칸 dict 리스트).
+
+    - _month_skeleton 위에 일정 유무/오늘 여부를 채워 넣은 결과.
+    - (오늘 날짜, 일정 있는 날짜 집합) 이 같으면 같은 결과를 돌려주므로 캐시한다.
+      일정이 바뀌면 schedule_dates 가 달라져서 자연스럽게 새로 만든다.
+    - 여러 요청이 같은 객체를 공유하므로 템플릿에서는 읽기만 한다.
+    """
+    return [
+        [
+            {
+                "day": day,                                 # 일(1~31)
+                "in_month": in_month,                       # 이번 달에 속하는 날짜인지 여부
+                "has_schedule": iso in schedule_dates,      # 해당 날짜에 일정이 있는지 여부
+                "is_today": iso == today_str,               # 오늘 날짜인지 여부
+            }
+            for day, iso, in_month in week
+        ]
+        for week in _month_skeleton(year, month)
+    ]
+
+
+def _dashboard_etag(today_str: str, upcoming, today_todos, schedule_dates) -> str:
+    """
+    대시보드 화면을 만드는 데 쓰는 데이터로 약한(weak) ETag 를 만든다.
+    (오늘 날짜 / 다가오는 일정 / 진행 중 TODO / 달력에 표시할 날짜)
+    """
+    return weak_etag(today_str, upcoming, today_todos, sorted(schedule_dates))
+
+
+# =========================
+# 메인 대시보드 ("/")
+# =========================
+@router.get("/", response_class=HTMLResponse, name="home")
+def dashboard(
+    request: Request,
+    db: Session = Depends(get_db),
+    today_info: tuple[date, str] = Depends(get_today),
+):
+    """
+    메인 대시보드 페이지 핸들러.
+
+    1) 오늘 날짜 기준으로
+       - 향후 15일 이내 일정(upcoming)
+       - 진행 중인 TODO 목록
+       - 이번 달 달력 정보
+      를 만들어서 dashboard.html 템플릿에 넘겨준다.
+    2) 일정/TODO 는 같은 db 세션 하나로 읽는다. (Depends(get_db))
+    3) DB 조회가 전부 동기 함수라서 async def 가 아닌 def 로 둔다.
+       → FastAPI 가 스레드풀에서 실행하므로 이벤트 루프를 막지 않는다.
+    """
+    # 오늘 날짜 (date 객체) 와 "YYYY-MM-DD" 문자열 (비교/템플릿용)
+    today, today_str = today_info
+
+    # ---- 다가오는 일정 (오늘 ~ 15일 뒤) ----
+    # 기간 필터, 정렬(sort_key), 개수 제한(LIMIT)은 모두 DB 쿼리에서 처리한다.
+    horizon = today + timedelta(days=15)
+    upcoming_sorted = load_schedule_between(db, today, horizon, limit=DASHBOARD_UPCOMING_LIMIT)
+
+    # ---- 오늘 TODO 목록 (진행 중인 것만) ----
+    todos = load_todos(db)
+    # status == "pending" 인 TODO만 오늘 보여준다
+    today_todos = [t for t in todos if t.status == "pending"]
+
+    # ---- 달력 데이터 생성 ----
+    # 달력 모양은 월별로 캐시되어 있다. (_month_skeleton)
+    skeleton = _month_skeleton(today.year, today.month)
+
+    # 달력에 보이는 기간(첫 주 일요일 ~ 마지막 주 토요일) 중
+    # 일정이 있는 날짜 집합만 DB 에서 가져온다. (칸마다 O(1) 확인)
+    schedule_dates = load_schedule_dates(
+        db,
+        date.fromisoformat(skeleton[0][0][1]),
+        date.fromisoformat(skeleton[-1][-1][1]),
+    )
+
+    # 날짜와 일정 있는 날짜 집합이 그대로면 이전에 만든 달력을 재사용한다.
+    weeks = _build_weeks(today.year, today.month, today_str, schedule_dates)
+
+    # ---- ETag: 화면에 들어가는 데이터가 그대로면 304 로 끝낸다 ----
+    # 브라우저가 보낸 If-None-Match 가 같으면 템플릿 렌더링/전송을 건너뛴다.
+    etag = _dashboard_etag(today_str, upcoming_sorted, today_todos, schedule_dates)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    # === 수정: 아래 로그는 개발 중 디버깅용이라, 실제 서비스 운영에는 필수는 아님.
+    # 필요할 때만 잠깐 주석을 풀어 사용해도 된다.
+    # logger.info(
+    #     "DASHBOARD_DEBUG: upcoming_shown=%d "
+    #     "todos_total=%d pending_shown=%d",
+    #     len(upcoming_sorted),
+    #     len(todos),
+    #     len(today_todos),
+    # )
+
+    # 템플릿에 데이터를 넘겨서 HTML을 렌더링
+    return render_page(
+        "dashboard.html",
+        {
+            "request": request,
+            "year": today.year,
+            "month": today.month,
+            "weeks": weeks,
+            "upcoming_items": upcoming_sorted,
+            "today_todos": today_todos,
+            "today_str": today_str,
+        },
+        headers=headers,
+    )
@@ -14,8 +14,10 @@
 
 from pathlib import Path
 from datetime import datetime, date, timedelta
+import hashlib
 import math
-import shutil
+import os
+import tempfile
 
 from fastapi import (
     APIRouter,
@@ -26,29 +28,147 @@ from fastapi import (
     HTTPException,
     Depends,
 )
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, Response
+from sqlalchemy import Row, func, insert, lambda_stmt, select
+from sqlalchemy.sql.lambdas import StatementLambdaElement
 from sqlalchemy.orm import Session
 
 from deps import (
     ITEMS_PER_PAGE_LIST,     # 리스트 뷰 페이지당 개수
     ITEMS_PER_PAGE_GALLERY,  # 갤러리 뷰 페이지당 개수
+    UPLOAD_DIR,              # 업로드 이미지 저장 폴더
     _parse_tags,             # "운동, 공부" → ["운동", "공부"]
-    templates,               # Jinja 템플릿 엔진
+    render_page,             # 템플릿 렌더링 (미리 컴파일해 둔 템플릿 사용)
+    get_today,               # (오늘 date, "YYYY-MM-DD") 의존성
+    weak_etag,               # 내용 해시로 만든 약한 ETag
+    etag_matches,            # If-None-Match 비교 (→ 304)
 )
 from db import get_db
 from models import Diary
 
+# 썸네일 생성용 (선택 의존성)
+# Pillow 가 설치되어 있지 않으면 썸네일 없이 목록에서도 원본 이미지를 그대로 쓴다.
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = ImageOps = None
+
 # 이 파일에서 사용할 라우터 객체 생성
 router = APIRouter()
 
+# 업로드 파일을 디스크로 복사할 때 한 번에 읽고 쓰는 크기 (1MB)
+# shutil.copyfileobj 기본값(64KB 이하)보다 크게 잡아서 큰 사진도 read/write 호출 몇 번으로 끝낸다.
+_UPLOAD_COPY_BUFSIZE = 1 << 20
+
+
+# -------------------------------------------------
+# 헬퍼 함수: 업로드 이미지 저장 (내용 해시 기반 파일 이름)
+# -------------------------------------------------
+def _store_upload(photo: UploadFile) -> str:
+    """
+    업로드된 이미지를 UPLOAD_DIR/<해시 앞 2글자>/<sha256>.<확장자> 로 저장하고
+    브라우저에서 접근할 URL("/uploads/ab/abcd....jpg")을 돌려준다.
+
+    - 파일 이름이 내용(sha256)으로 정해지므로 같은 사진을 다시 올리면
+      새로 쓰지 않고 기존 파일을 그대로 가리킨다. (디스크/백업 ZIP 크기 절약)
+    - 임시 파일에 쓰면서 동시에 해시를 계산하고, 다 쓴 뒤 최종 이름으로 옮긴다.
+      (중간에 실패해도 반쯤 쓴 파일이 최종 이름으로 남지 않는다)
+    """
+    ext = Path(photo.filename).suffix.lower()
+    digest = hashlib.sha256()
+
+    fd, tmp_name = tempfile.mkstemp(dir=UPLOAD_DIR, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as buffer:
+            while chunk := photo.file.read(_UPLOAD_COPY_BUFSIZE):
+                digest.update(chunk)
+                buffer.write(chunk)
+
+        name = digest.hexdigest()
+        save_dir = UPLOAD_DIR / name[:2]
+        save_path = save_dir / f"{name}{ext}"
+
+        if save_path.exists():
+            # 같은 내용의 파일이 이미 있음 → 새로 쓴 임시 파일은 버린다.
+            os.unlink(tmp_name)
+        else:
+            save_dir.mkdir(exist_ok=True)
+            os.replace(tmp_name, save_path)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+        raise
+
+    return f"/uploads/{name[:2]}/{name}{ext}"
+
+
+# 갤러리 썸네일 최대 크기(px) / WebP 품질
+_THUMB_SIZE = (480, 480)
+_THUMB_QUALITY = 70
+
+
+def _make_thumbnail(image_url: str) -> str | None:
+    """
+    _store_upload 로 저장한 이미지의 작은 WebP 썸네일을 만들고 그 URL 을 돌려준다.
+    ("/uploads/ab/<해시>.jpg" → "/uploads/ab/<해시>_thumb.webp")
+
+    - 갤러리 목록에서 원본(수 MB) 대신 이 작은 파일을 받게 해서 전송량을 줄인다.
+    - 원본 파일 이름이 내용 해시라서 썸네일이 이미 있으면 다시 만들지 않는다.
+    - Pillow 가 없거나 이미지로 열 수 없는 파일이면 None (→ 목록에서도 원본 사용)
+    """
+    if Image is None:
+        return None
+
+    src_path = UPLOAD_DIR / image_url[len("/uploads/"):]
+    thumb_path = src_path.with_name(f"{src_path.stem}_thumb.webp")
+    thumb_url = f"{image_url.rsplit('/', 1)[0]}/{thumb_path.name}"
+    if thumb_path.exists():
+        return thumb_url
+
+    tmp_name = None
+    try:
+        with Image.open(src_path) as im:
+            # 휴대폰 사진의 EXIF 회전 정보를 실제 픽셀에 반영한 뒤 줄인다.
+            im = ImageOps.exif_transpose(im)
+            if im.mode not in ("RGB", "RGBA"):
+                im = im.convert("RGBA")
+            im.thumbnail(_THUMB_SIZE)
+
+            fd, tmp_name = tempfile.mkstemp(dir=thumb_path.parent, suffix=".part")
+            with os.fdopen(fd, "wb") as out:
+                im.save(out, format="WEBP", quality=_THUMB_QUALITY)
+        os.replace(tmp_name, thumb_path)
+    except Exception:
+        if tmp_name and os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+        return None
+
+    return thumb_url
+
+
+# -------------------------------------------------
+# 목록/상세 화면에서 쓰는 Diary 컬럼
+# -------------------------------------------------
+# ORM 객체 전체를 만들지 않고 이 컬럼들만 Row 로 가져온다.
+_DIARY_COLUMNS = (
+    Diary.id,
+    Diary.title,
+    Diary.content,
+    Diary.image_url,
+    Diary.thumbnail_url,
+    Diary.created_at,
+    Diary.tags,
+)
+
 
 # -------------------------------------------------
-# 헬퍼 함수: Diary ORM 객체 → 템플릿용 dict 로 변환
+# 헬퍼 함수: Diary Row → 템플릿용 dict 로 변환
 # -------------------------------------------------
-def _diary_to_dict(row: Diary) -> dict:
+def _diary_to_dict(row: Row) -> dict:
     """
-    Diary ORM 객체를 템플릿/JSON에서 쓰기 편한 dict 형태로 변환한다.
+    _DIARY_COLUMNS 로 조회한 Row 를 템플릿/JSON에서 쓰기 편한 dict 형태로 변환한다.
     - created_at 은 "YYYY-MM-DD HH:MM" 문자열로 변환
+      (strftime 대신 C 구현인 isoformat 을 쓰고, Postgres 의 "+09:00" 같은 시간대 부분은 잘라낸다)
     - tags 는 문자열(쉼표 구분)을 리스트로 변환
     """
     return {
@@ -56,16 +176,74 @@ def _diary_to_dict(row: Diary) -> dict:
         "title": row.title,
         "content": row.content,
         "image_url": row.image_url,
-        "created_at": row.created_at.strftime("%Y-%m-%d %H:%M") if row.created_at else "",
+        # 썸네일이 없는 글(예전 글, Pillow 없음)은 원본 이미지를 그대로 쓴다.
+        "thumbnail_url": row.thumbnail_url or row.image_url,
+        "created_at": row.created_at.isoformat(" ", "minutes")[:16] if row.created_at else "",
         "tags": _parse_tags(row.tags or ""),
     }
 
 
+def _get_diary_row(db: Session, entry_id: str) -> Row:
+    """
+    entry_id 에 해당하는 일기 한 건을 _DIARY_COLUMNS 로 가져온다. (없으면 404)
+    """
+    row = db.execute(
+        select(*_DIARY_COLUMNS).where(Diary.id == int(entry_id))
+    ).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Entry not found")
+    return row
+
+
 # =================================================
 # 1) 기록 목록 + 검색
 # =================================================
+
+# 목록 쿼리는 lambda_stmt 로 만든다.
+#   - lambda 코드 위치를 캐시 키로 써서, 요청마다 select()/where() 객체를 새로 조립하고
+#     캐시 키를 계산하는 ORM 작업을 건너뛰고 컴파일된 SQL 을 재사용한다.
+#   - lambda 안에서 쓰는 지역 변수(dt_from, tag, offset 등)는 바인드 파라미터가 된다.
+_DIARY_PAGE_BASE = lambda_stmt(
+    lambda: select(*_DIARY_COLUMNS, func.count().over().label("total_items"))
+)
+_DIARY_COUNT_BASE = lambda_stmt(lambda: select(func.count()).select_from(Diary))
+
+
+def _diary_filtered(
+    stmt: StatementLambdaElement,
+    dt_from: datetime | None,
+    dt_to: datetime | None,
+    tag: str | None,
+) -> StatementLambdaElement:
+    """
+    목록/개수 쿼리에 기간(created_at) / 태그 필터를 붙인다.
+    (어떤 필터가 붙었는지에 따라 캐시되는 SQL 도 따로 생긴다)
+    """
+    if dt_from:
+        stmt += lambda s: s.where(Diary.created_at >= dt_from)
+    if dt_to:
+        stmt += lambda s: s.where(Diary.created_at <= dt_to)
+    if tag:
+        # 태그 필터 (단순 LIKE 검색: "운동" 포함된 것 등)
+        stmt += lambda s: s.where(Diary.tags.contains(tag))
+    return stmt
+
+
+# 기간 필터(range) → (시작일, 종료일) 계산 함수. 인자는 오늘 날짜.
+# (custom 은 사용자가 입력한 start/end 를 쓰므로 핸들러에서 따로 처리)
+_RANGE_FNS = {
+    # 오늘 하루만
+    "today": lambda t: (t, t),
+    # 어제 하루만
+    "yesterday": lambda t: (t - timedelta(days=1),) * 2,
+    # 이번 주 월요일 ~ 오늘
+    "week": lambda t: (t - timedelta(days=t.weekday()), t),
+    # 이번 달 1일 ~ 오늘
+    "month": lambda t: (date(t.year, t.month, 1), t),
+}
+
 @router.get("/diary", response_class=HTMLResponse, name="diary_index")
-async def diary_index(
+def diary_index(
     request: Request,
     range: str = "all",         # 기간 필터 (today, yesterday, week, month, custom, all)
     start: str | None = None,   # custom 모드일 때 시작일(YYYY-MM-DD)
@@ -74,34 +252,22 @@ async def diary_index(
     page: int = 1,              # 페이지 번호
     view: str = "list",         # list / gallery
     db: Session = Depends(get_db),
+    today_info: tuple[date, str] = Depends(get_today),
 ):
     """
     기록 목록 + 검색 화면
     - 기간(range) / 태그(tag) / 뷰(view) / 페이지(page) 를 기준으로 목록을 보여준다.
     """
-    today = date.today()
+    today, _ = today_info
     date_from: date | None = None
     date_to: date | None = None
 
     # -----------------------------
     # 기간 계산 (range 값에 따라)
     # -----------------------------
-    if range == "today":
-        # 오늘 하루만
-        date_from = date_to = today
-    elif range == "yesterday":
-        y = today - timedelta(days=1)
-        date_from = date_to = y
-    elif range == "week":
-        # 이번 주 월요일 ~ 오늘
-        start_of_week = today - timedelta(days=today.weekday())
-        date_from = start_of_week
-        date_to = today
-    elif range == "month":
-        # 이번 달 1일 ~ 오늘
-        start_of_month = date(today.year, today.month, 1)
-        date_from = start_of_month
-        date_to = today
+    range_fn = _RANGE_FNS.get(range)
+    if range_fn:
+        date_from, date_to = range_fn(today)
     elif range == "custom":
         # 사용자가 직접 입력한 기간 사용
         if start:
@@ -110,43 +276,49 @@ async def diary_index(
             date_to = datetime.strptime(end, "%Y-%m-%d").date()
     # range == "all" 이면 date_from/date_to 둘 다 None → 전체
 
-    # -----------------------------
-    # 기본 쿼리 (SELECT * FROM diaries)
-    # -----------------------------
-    query = db.query(Diary)
-
-    # 날짜 필터 (created_at 을 날짜 범위로 필터)
-    if date_from:
-        dt_from = datetime.combine(date_from, datetime.min.time())
-        query = query.filter(Diary.created_at >= dt_from)
-    if date_to:
-        dt_to = datetime.combine(date_to, datetime.max.time())
-        query = query.filter(Diary.created_at <= dt_to)
-
-    # 태그 필터 (단순 LIKE 검색: "운동" 포함된 것 등)
-    if tag:
-        query = query.filter(Diary.tags.contains(tag))
-
-    # 최신순 정렬 (created_at DESC)
-    query = query.order_by(Diary.created_at.desc())
+    # 날짜 필터는 created_at 을 하루 시작/끝 시각으로 비교한다.
+    dt_from = datetime.combine(date_from, datetime.min.time()) if date_from else None
+    dt_to = datetime.combine(date_to, datetime.max.time()) if date_to else None
 
     # 뷰 타입에 따라 페이지당 개수 결정
     per_page = ITEMS_PER_PAGE_GALLERY if view == "gallery" else ITEMS_PER_PAGE_LIST
 
-    # 전체 개수 / 총 페이지 계산
-    total_items = query.count()
+    # 해당 페이지 레코드 + 전체 개수를 한 번의 쿼리로 가져온다.
+    #   COUNT(*) OVER () : LIMIT/OFFSET 전에 계산되므로 필터에 걸린 전체 개수가 모든 행에 붙는다.
+    #   (예전에는 query.count() 로 DB 를 한 번 더 다녀왔다.)
+    page_stmt = _diary_filtered(_DIARY_PAGE_BASE, dt_from, dt_to, tag)
+
+    def fetch_page(page: int) -> list[Row]:
+        offset = (page - 1) * per_page
+        stmt = page_stmt + (
+            lambda s: s.order_by(Diary.created_at.desc()).offset(offset).limit(per_page)
+        )
+        return db.execute(stmt).all()
+
+    page = max(1, page)
+    rows = fetch_page(page)
+
+    if rows:
+        total_items = rows[0].total_items
+    elif page > 1:
+        # 범위를 벗어난 page 요청 → 행이 없어서 개수도 모르므로, 이때만 따로 센다.
+        total_items = db.execute(
+            _diary_filtered(_DIARY_COUNT_BASE, dt_from, dt_to, tag)
+        ).scalar_one()
+    else:
+        total_items = 0
+
     total_pages = max(1, math.ceil(total_items / per_page)) if total_items else 1
 
-    # page 범위 보정 (1 ~ total_pages)
-    page = max(1, min(page, total_pages))
-    start_idx = (page - 1) * per_page
+    # page 범위 보정 (1 ~ total_pages). 마지막 페이지로 옮겨서 다시 가져온다.
+    if page > total_pages:
+        page = total_pages
+        rows = fetch_page(page)
 
-    # 실제로 해당 페이지에 들어갈 레코드만 가져오기
-    rows = query.offset(start_idx).limit(per_page).all()
     entries = [_diary_to_dict(r) for r in rows]
 
     # diary.html 템플릿 렌더링
-    return templates.TemplateResponse(
+    return render_page(
         "diary.html",
         {
             "request": request,
@@ -166,7 +338,7 @@ async def diary_index(
 # 2) 새 기록 저장
 # =================================================
 @router.post("/save", response_class=RedirectResponse)
-async def save_entry(
+def save_entry(
     request: Request,
     title: str = Form(...),
     content: str = Form(...),
@@ -182,27 +354,16 @@ async def save_entry(
     - 태그 문자열 정리
     - DB INSERT
     """
-    # 순환 import 방지를 위해 함수 내부에서 import
-    from deps import UPLOAD_DIR
-
     image_url: str | None = None
+    thumbnail_url: str | None = None
 
     # -----------------------------
     # 이미지 업로드 처리
     # -----------------------------
     if photo and photo.filename:
-        # 파일 이름: 타임스탬프 기반 (충돌 방지)
-        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-        ext = Path(photo.filename).suffix
-        filename = f"{ts}{ext}"
-        save_path = UPLOAD_DIR / filename
-
-        # 업로드된 파일을 디스크에 저장
-        with save_path.open("wb") as buffer:
-            shutil.copyfileobj(photo.file, buffer)
-
-        # 템플릿/브라우저에서 접근할 수 있는 URL
-        image_url = f"/uploads/{filename}"
+        # 파일 이름: 내용 해시 기반 (같은 사진은 한 번만 저장)
+        image_url = _store_upload(photo)
+        thumbnail_url = _make_thumbnail(image_url)
 
     # -----------------------------
     # 태그 문자열 정리
@@ -213,15 +374,19 @@ async def save_entry(
     # -----------------------------
     # DB 저장 (Diary INSERT)
     # -----------------------------
-    diary = Diary(
-        title=title,
-        content=content.replace("\r\n", "\n"),  # 줄바꿈을 \n 으로 통일
-        image_url=image_url,
-        tags=tags_str,
+    # 저장 후에는 목록으로 리다이렉트만 하므로 새 id 를 다시 읽을 필요가 없다.
+    # (예전의 db.refresh(diary) 는 INSERT 뒤에 SELECT 를 한 번 더 보냈다)
+    # ORM 객체 없이 INSERT 한 번만 실행한다.
+    db.execute(
+        insert(Diary).values(
+            title=title,
+            content=content.replace("\r\n", "\n"),  # 줄바꿈을 \n 으로 통일
+            image_url=image_url,
+            thumbnail_url=thumbnail_url,
+            tags=tags_str,
+        )
     )
-    db.add(diary)
     db.commit()
-    db.refresh(diary)  # INSERT 후 생성된 id 등을 다시 객체에 반영
 
     # 저장 후 돌아갈 위치 (리다이렉트)
     target = redirect_url or f"/diary?view={view}"
@@ -232,7 +397,7 @@ async def save_entry(
 # 3) 단일 기록 상세보기
 # =================================================
 @router.get("/entry/{entry_id}", response_class=HTMLResponse)
-async def read_entry(
+def read_entry(
     request: Request,
     entry_id: str,
     view: str = "list",
@@ -241,19 +406,22 @@ async def read_entry(
     """
     단일 일기 상세보기 페이지.
     """
-    diary = db.get(Diary, int(entry_id))
-    if not diary:
-        raise HTTPException(status_code=404, detail="Entry not found")
+    entry = _diary_to_dict(_get_diary_row(db, entry_id))
 
-    entry = _diary_to_dict(diary)
+    # 내용이 그대로면 템플릿 렌더링/전송을 건너뛰고 304
+    etag = weak_etag(entry, view)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
 
-    return templates.TemplateResponse(
+    return render_page(
         "detail.html",
         {
             "request": request,
             "entry": entry,
             "view": view,
         },
+        headers=headers,
     )
 
 
@@ -261,7 +429,7 @@ async def read_entry(
 # 4) 수정 폼
 # =================================================
 @router.get("/entry/{entry_id}/edit", response_class=HTMLResponse)
-async def edit_entry_form(
+def edit_entry_form(
     request: Request,
     entry_id: str,
     view: str = "list",
@@ -271,15 +439,11 @@ async def edit_entry_form(
     수정 폼 페이지.
     - 현재 내용을 불러와서 form에 채워 넣어준다.
     """
-    diary = db.get(Diary, int(entry_id))
-    if not diary:
-        raise HTTPException(status_code=404, detail="Entry not found")
-
-    entry = _diary_to_dict(diary)
+    entry = _diary_to_dict(_get_diary_row(db, entry_id))
     # 텍스트박스에 보여줄 태그 문자열 ("운동, 공부")
     tags_str = ", ".join(entry.get("tags", []))
 
-    return templates.TemplateResponse(
+    return render_page(
         "edit_entry.html",
         {
             "request": request,
@@ -294,7 +458,7 @@ async def edit_entry_form(
 # 5) 수정 제출
 # =================================================
 @router.post("/entry/{entry_id}/edit")
-async def edit_entry_submit(
+def edit_entry_submit(
     entry_id: str,
     title: str = Form(...),
     content: str = Form(...),
@@ -310,8 +474,6 @@ async def edit_entry_submit(
     - 제목/내용/태그 수정
     - 기존 이미지 삭제/유지/새 이미지로 교체
     """
-    from deps import UPLOAD_DIR
-
     diary = db.get(Diary, int(entry_id))
     if not diary:
         raise HTTPException(status_code=404, detail="Entry not found")
@@ -328,23 +490,15 @@ async def edit_entry_submit(
     # -----------------------------
     if remove_image:
         diary.image_url = None
+        diary.thumbnail_url = None
 
     # -----------------------------
     # 새 이미지 업로드 (있을 경우)
     # -----------------------------
     if photo and photo.filename:
-        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-        ext = Path(photo.filename).suffix
-        # entry_id 를 파일 이름에 포함시켜 어떤 글의 이미지인지 추적 가능하게 함
-        filename = f"{entry_id}_{ts}{ext}"
-        save_path = UPLOAD_DIR / filename
+        diary.image_url = _store_upload(photo)
+        diary.thumbnail_url = _make_thumbnail(diary.image_url)
 
-        with save_path.open("wb") as buffer:
-            shutil.copyfileobj(photo.file, buffer)
-
-        diary.image_url = f"/uploads/{filename}"
-
-    db.add(diary)
     db.commit()
 
     target = redirect_url or f"/diary?view={view}"
@@ -355,7 +509,7 @@ async def edit_entry_submit(
 # 6) 삭제
 # =================================================
 @router.post("/entry/{entry_id}/delete")
-async def delete_entry(
+def delete_entry(
     entry_id: str,
     view: str = Form("list"),
     redirect_url: str | None = Form(None),
@@ -379,7 +533,9 @@ async def delete_entry(
 # 7) JSON API (인라인 에디터용)
 # =================================================
 @router.get("/api/entry/{entry_id}")
-async def api_get_entry(
+def api_get_entry(
+    request: Request,
+    response: Response,
     entry_id: str,
     db: Session = Depends(get_db),
 ):
@@ -389,9 +545,13 @@ async def api_get_entry(
     - 화면에서 fetch("/api/entry/123") 같은 식으로 호출해서
       JSON 데이터를 받아서 바로 에디터에 채워 넣는 용도.
     """
-    diary = db.get(Diary, int(entry_id))
-    if not diary:
-        raise HTTPException(status_code=404, detail="Entry not found")
+    entry = _diary_to_dict(_get_diary_row(db, entry_id))
+
+    # 에디터를 다시 열 때 내용이 그대로면 본문 없이 304
+    etag = weak_etag(entry)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
 
-    entry = _diary_to_dict(diary)
+    response.headers.update(headers)
     return entry
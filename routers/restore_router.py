@@ -9,24 +9,134 @@
 # ---------------------------------------------------------
 
 import io
-import json
+import os
+import shutil
+import tempfile
 import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
+import orjson
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
 from fastapi.responses import RedirectResponse
+from sqlalchemy import delete, insert
 from sqlalchemy.orm import Session
 
 from db import get_db
 from models import Diary, Schedule, Todo
-from deps import UPLOAD_DIR  # 이미지 저장 폴더
+from deps import (
+    DATA_DIR,              # 임시 파일을 둘 데이터 폴더
+    UPLOAD_DIR,            # 이미지 저장 폴더
+    invalidate_cache,      # 조회 캐시 비우기
+    schedule_sort_value,   # 일정 정렬용 sort_key 계산
+)
 
 router = APIRouter()
 
+# 업로드 파일 / ZIP 안의 파일을 복사할 때 한 번에 읽고 쓰는 크기 (1MB)
+_COPY_BUF_SIZE = 1 << 20
+
+# 이미지 복원 때 동시에 압축을 푸는 스레드 수 (파일 I/O / zlib 은 GIL 을 놓는다)
+_EXTRACT_WORKERS = 8
+
+# Diary 모델에 updated_at 컬럼이 있는지 (지금은 없음. 구버전 백업 호환/미래 확장용)
+# 행마다 hasattr 로 확인하지 않도록 import 시점에 한 번만 본다.
+_DIARY_HAS_UPDATED_AT = "updated_at" in Diary.__table__.c
+
+
+def _spool_upload(src, dst) -> None:
+    """
+    업로드 파일(src) 내용을 열린 파일(dst)에 복사한다.
+
+    - 업로드가 이미 디스크로 넘어간 SpooledTemporaryFile 이면 (1MB 초과 업로드)
+      os.sendfile 로 커널 안에서 바로 복사한다. (파이썬으로 바이트를 읽고 쓰지 않음)
+    - 아직 메모리에 있거나 sendfile 이 안 되는 환경이면 _COPY_BUF_SIZE 단위로 복사한다.
+      (메모리에 있는 SpooledTemporaryFile 에 fileno() 를 부르면 디스크로 옮겨 써 버리므로
+       starlette UploadFile._in_memory 와 같은 방법으로 _rolled 를 먼저 본다)
+    """
+    if getattr(src, "_rolled", True) and hasattr(os, "sendfile"):
+        try:
+            in_fd = src.fileno()
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            in_fd = None
+
+        if in_fd is not None:
+            dst.flush()
+            offset = src.tell()
+            try:
+                while sent := os.sendfile(dst.fileno(), in_fd, offset, _COPY_BUF_SIZE * 4):
+                    offset += sent
+                return
+            except OSError:
+                # 파일 시스템이 sendfile 을 지원하지 않는 경우 → 보낸 곳 다음부터 일반 복사
+                src.seek(offset)
+
+    shutil.copyfileobj(src, dst, _COPY_BUF_SIZE)
+
+
+def _same_file(path: Path, info: zipfile.ZipInfo) -> bool:
+    """
+    path 파일이 ZIP 항목(info)과 같은 내용인지 크기 → CRC32 순서로 확인한다.
+    (크기가 다르면 파일을 읽지도 않는다)
+    """
+    try:
+        if path.stat().st_size != info.file_size:
+            return False
+    except FileNotFoundError:
+        return False
+
+    crc = 0
+    with path.open("rb") as f:
+        while chunk := f.read(_COPY_BUF_SIZE):
+            crc = zlib.crc32(chunk, crc)
+    return crc == info.CRC
+
+
+def _extract_members(zip_path: Path, targets: list[tuple[zipfile.ZipInfo, Path]]) -> None:
+    """
+    ZIP 안의 파일들(targets: (ZIP 항목 정보, 저장할 경로))을 디스크에 풀어 쓴다.
+
+    - 스레드마다 한 번 호출되므로 ZipFile 도 여기서 따로 연다.
+    - zf.read() 로 파일 전체를 bytes 로 만들지 않고 _COPY_BUF_SIZE 씩 흘려서 쓴다.
+    """
+    with zipfile.ZipFile(zip_path, mode="r") as zf:
+        for info, target_path in targets:
+            # 이미 같은 내용의 파일이 있으면 (최근 백업을 다시 복원하는 경우 등) 건너뛴다.
+            # ZIP 에 들어 있는 크기/CRC32 와 비교하므로 압축을 풀 필요가 없다.
+            # (info 는 같은 ZIP 파일을 연 다른 ZipFile 에서 얻은 것이지만 위치 정보는 똑같다)
+            if _same_file(target_path, info):
+                continue
+            with zf.open(info) as src, target_path.open("wb") as dst:
+                shutil.copyfileobj(src, dst, _COPY_BUF_SIZE)
+
+
+def _insert_rows(db: Session, model, rows: list[dict]) -> None:
+    """
+    rows(dict 리스트)를 model 테이블에 INSERT 한 번(executemany)으로 넣는다. (비어 있으면 생략)
+    """
+    if rows:
+        db.execute(insert(model), rows)
+
+
+def _parse_datetime(value) -> datetime | None:
+    """
+    백업 JSON 의 ISO 형식 날짜 문자열 → datetime. (비었거나 형식이 틀리면 None)
+
+    null / 빈 문자열 / 숫자 등은 파싱을 시도하지 않고 바로 None.
+    (예외가 실제로 나는 건 진짜 잘못된 문자열일 때뿐이라 행마다 예외 비용이 들지 않는다)
+    """
+    if not isinstance(value, str) or len(value) < 10:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
 
 @router.post("/restore/db", response_class=RedirectResponse)
-async def restore_db(
+def restore_db(
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
 ):
@@ -39,6 +149,8 @@ async def restore_db(
 
     ⚠ 기존 DB 내용 전부 삭제됨.
     ⚠ 기존 uploads 파일도 ZIP 내용으로 덮어쓰기됨.
+
+    파일 복사/압축 해제/동기 DB 작업을 하므로 def 로 두어 스레드풀에서 실행되게 한다.
     """
 
     # -----------------------------
@@ -47,36 +159,40 @@ async def restore_db(
     if not file.filename.endswith(".zip"):
         raise HTTPException(status_code=400, detail="ZIP 파일을 업로드해주세요.")
 
-    # ZIP 파일 내용을 메모리로 읽기
-    content = await file.read()
+    # 업로드된 ZIP 을 메모리에 통째로 올리지 않고 DATA_DIR 의 임시 파일로 복사한다.
+    # (큰 백업도 메모리 사용량이 _COPY_BUF_SIZE 정도로 일정하다)
+    with tempfile.NamedTemporaryFile(dir=DATA_DIR, suffix=".zip", delete=False) as tmp:
+        _spool_upload(file.file, tmp)
+    tmp_path = Path(tmp.name)
 
     try:
-        mem_file = io.BytesIO(content)
-
         # -----------------------------
         # 2) ZIP 파일 열기
         # -----------------------------
-        with zipfile.ZipFile(mem_file, mode="r") as zf:
-            namelist = zf.namelist()
-
+        with zipfile.ZipFile(tmp_path, mode="r") as zf:
             # === 수정: 백업 JSON 파일 이름 호환 처리 ===
             # 1순위: 예전 이름 steplog_backup.json
             # 2순위: steplog_backup_YYYYMMDD.json 패턴 중 하나 (여러 개면 가장 최근 이름)
+            # ZIP 항목 목록은 한 번만 훑으면서 JSON 후보 / 이미지 목록을 같이 나눈다.
             backup_json_name: str | None = None
-
-            # 1) 구버전 이름이 있으면 그걸 우선 사용
-            if "steplog_backup.json" in namelist:
-                backup_json_name = "steplog_backup.json"
-            else:
-                # 2) 새 버전 패턴: steplog_backup_YYYYMMDD.json
-                candidates = [
-                    name
-                    for name in namelist
-                    if name.startswith("steplog_backup_") and name.endswith(".json")
-                ]
-                if candidates:
-                    # 여러 개 있으면 이름 기준으로 정렬해서 '가장 뒤에 것(보통 최신)' 사용
-                    backup_json_name = sorted(candidates)[-1]
+            candidates: list[str] = []
+            image_infos: list[zipfile.ZipInfo] = []   # uploads/... 이미지 항목 (폴더 항목 제외)
+
+            # infolist() 의 ZipInfo 를 그대로 모아 두면 압축 풀 때 getinfo() 로 다시 찾지 않아도 된다.
+            for info in zf.infolist():
+                name = info.filename
+                if name == "steplog_backup.json":
+                    # 1) 구버전 이름
+                    backup_json_name = name
+                elif name.startswith("steplog_backup_") and name.endswith(".json"):
+                    # 2) 새 버전 패턴: steplog_backup_YYYYMMDD.json
+                    candidates.append(name)
+                elif name.startswith("uploads/") and not info.is_dir():
+                    image_infos.append(info)
+
+            if backup_json_name is None and candidates:
+                # 여러 개 있으면 이름 기준으로 '가장 뒤에 것(보통 최신)' 사용
+                backup_json_name = max(candidates)
 
             if not backup_json_name:
                 # 둘 중 어느 패턴도 없으면 에러
@@ -89,96 +205,107 @@ async def restore_db(
             # JSON 데이터 읽기
             json_bytes = zf.read(backup_json_name)
 
-            # uploads/... 이미지 목록
-            image_names = [name for name in namelist if name.startswith("uploads/")]
-
             # -----------------------------
             # 3) JSON → dict 변환
             # -----------------------------
             try:
-                data = json.loads(json_bytes.decode("utf-8"))
+                # orjson 은 bytes 를 바로 파싱한다. (UTF-8 디코딩 포함)
+                data = orjson.loads(json_bytes)
             except Exception:
                 raise HTTPException(status_code=400, detail="JSON 파싱에 실패했습니다.")
 
-            diaries_data = data.get("diaries", [])
-            schedules_data = data.get("schedules", [])
-            todos_data = data.get("todos", [])
+            # 메모리 사용량 줄이기:
+            # - 파싱이 끝난 원본 bytes 는 바로 놓아 준다.
+            # - 테이블별 리스트는 pop 으로 꺼내서, 아래에서 INSERT 가 끝나면 del 로 바로 해제되게 한다.
+            #   (JSON 원본 + 전체 dict + INSERT 용 행 리스트가 한꺼번에 메모리에 있지 않도록)
+            del json_bytes
+            diaries_data = data.pop("diaries", [])
+            schedules_data = data.pop("schedules", [])
+            todos_data = data.pop("todos", [])
 
             # =====================================================
             # 4) DB 전체 삭제 후 → ZIP 내용으로 갈아끼우기
             # =====================================================
             try:
                 # 기존 데이터 모두 삭제
-                db.query(Diary).delete()
-                db.query(Schedule).delete()
-                db.query(Todo).delete()
-                db.commit()
+                # - ORM 의 query().delete() 대신 DELETE 문을 바로 실행한다.
+                # - 여기서 commit 하지 않고 아래 INSERT 까지 한 트랜잭션으로 묶는다.
+                #   (commit 한 번 = fsync 한 번. 중간에 실패하면 rollback 으로 삭제도 되돌아간다)
+                for model in (Diary, Schedule, Todo):
+                    db.execute(delete(model))
 
                 # -----------------------------
                 # Diary 복원
                 # -----------------------------
+                # 행마다 ORM 객체를 만들어 db.add 하지 않고,
+                # dict 리스트를 만들어 테이블마다 INSERT 한 번(executemany)으로 넣는다. (_insert_rows)
+                # created_at 이 없는 행은 DB 기본값(now())이 들어가도록 키 자체를 빼야 해서
+                # 두 리스트로 나눈다.
+                diary_rows: list[dict] = []
+                diary_rows_no_created: list[dict] = []
                 for d in diaries_data:
-                    # created_at 복원 (ISO 형식일 경우)
-                    created_at = None
-                    if d.get("created_at"):
-                        try:
-                            created_at = datetime.fromisoformat(d["created_at"])
-                        except Exception:
-                            created_at = None
-
-                    # updated_at 복원 (Diary 모델엔 없지만, 혹시 모를 구버전 호환용)
-                    updated_at = None
-                    if d.get("updated_at"):
-                        try:
-                            updated_at = datetime.fromisoformat(d["updated_at"])
-                        except Exception:
-                            updated_at = None
-
-                    diary = Diary(
-                        title=d.get("title") or "",
-                        content=d.get("content") or "",
-                        image_url=d.get("image_url"),
-                        tags=d.get("tags") or "",
-                    )
-
-                    # created_at이 있으면 덮어쓰기
-                    if created_at:
-                        diary.created_at = created_at
+                    row = {
+                        "title": d.get("title") or "",
+                        "content": d.get("content") or "",
+                        "image_url": d.get("image_url"),
+                        "thumbnail_url": d.get("thumbnail_url"),
+                        "tags": d.get("tags") or "",
+                    }
 
                     # Diary 모델에 updated_at 이 있다면(미래 확장 대비) 적용
-                    if hasattr(diary, "updated_at") and updated_at:
-                        diary.updated_at = updated_at
+                    if _DIARY_HAS_UPDATED_AT:
+                        updated_at = _parse_datetime(d.get("updated_at"))
+                        if updated_at:
+                            row["updated_at"] = updated_at
+
+                    # created_at 복원 (ISO 형식일 경우)
+                    created_at = _parse_datetime(d.get("created_at"))
+                    if created_at:
+                        row["created_at"] = created_at
+                        diary_rows.append(row)
+                    else:
+                        diary_rows_no_created.append(row)
 
-                    db.add(diary)
+                _insert_rows(db, Diary, diary_rows)
+                _insert_rows(db, Diary, diary_rows_no_created)
+                del diaries_data, diary_rows, diary_rows_no_created
 
                 # -----------------------------
                 # Schedule 복원
                 # -----------------------------
-                for s in schedules_data:
-                    sched = Schedule(
-                        date=s.get("date") or "",
-                        title=s.get("title") or "",
-                        memo=s.get("memo"),
-                        time_str=s.get("time_str"),
-                        place=s.get("place"),
-                        done=bool(s.get("done", False)),
-                    )
-                    db.add(sched)
+                schedule_rows = [
+                    {
+                        "date": s.get("date") or "",
+                        "title": s.get("title") or "",
+                        "memo": s.get("memo"),
+                        "time_str": s.get("time_str"),
+                        "place": s.get("place"),
+                        "done": bool(s.get("done", False)),
+                        "sort_key": schedule_sort_value(s.get("date") or "", s.get("time_str")),
+                    }
+                    for s in schedules_data
+                ]
+                _insert_rows(db, Schedule, schedule_rows)
+                del schedules_data, schedule_rows
 
                 # -----------------------------
                 # Todo 복원
                 # -----------------------------
-                for t in todos_data:
-                    todo = Todo(
-                        id=t.get("id"),
-                        date=t.get("date") or "",
-                        title=t.get("title") or "",
-                        status=t.get("status") or "pending",
-                        order=t.get("order") or 0,
-                    )
-                    db.add(todo)
+                todo_rows = [
+                    {
+                        "id": t.get("id"),
+                        "date": t.get("date") or "",
+                        "title": t.get("title") or "",
+                        "status": t.get("status") or "pending",
+                        "order": t.get("order") or 0,
+                    }
+                    for t in todos_data
+                ]
+                _insert_rows(db, Todo, todo_rows)
+                del todos_data, todo_rows
 
                 db.commit()
+                invalidate_cache("schedule", "todos")
 
             except Exception as e:
                 db.rollback()
@@ -200,25 +327,39 @@ async def restore_db(
                 #         old.unlink()
 
                 # ZIP 에 포함된 uploads/* 파일을 그대로 저장
-                for name in image_names:
-                    # name = "uploads/파일명"
-                    rel_path = name[len("uploads/"):]
-                    if not rel_path:
+                # name = "uploads/파일명" → upload_dir/파일명
+                # ("../" 등으로 upload_dir 밖을 가리키는 이름은 건너뛴다)
+                upload_root = upload_dir.resolve()
+                targets: list[tuple[zipfile.ZipInfo, Path]] = []
+                for info in image_infos:
+                    target_path = (upload_root / info.filename[len("uploads/"):]).resolve()
+                    if not target_path.is_relative_to(upload_root):
                         continue
-
-                    data_bytes = zf.read(name)
-
-                    target_path = upload_dir / rel_path
-                    target_path.parent.mkdir(parents=True, exist_ok=True)
-
-                    with target_path.open("wb") as f:
-                        f.write(data_bytes)
+                    targets.append((info, target_path))
+
+                # 하위 폴더는 파일마다 mkdir 하지 않고 미리 한 번씩만 만든다.
+                for parent in {target_path.parent for _, target_path in targets}:
+                    parent.mkdir(parents=True, exist_ok=True)
+
+                # 파일 쓰기는 여러 스레드로 나눠서 동시에 한다.
+                # ZipFile 객체는 스레드 간에 같이 쓰면 안 되므로 스레드마다 따로 연다.
+                workers = min(_EXTRACT_WORKERS, len(targets))
+                if workers:
+                    with ThreadPoolExecutor(max_workers=workers) as pool:
+                        # list() 로 결과를 모두 받아야 스레드 안의 예외가 여기서 다시 올라온다.
+                        list(pool.map(
+                            _extract_members,
+                            [tmp_path] * workers,
+                            [targets[i::workers] for i in range(workers)],
+                        ))
 
             except Exception as e:
                 raise HTTPException(status_code=500, detail=f"이미지 복원 중 오류 발생: {e}")
 
     except zipfile.BadZipFile:
         raise HTTPException(status_code=400, detail="손상된 ZIP 파일입니다.")
+    finally:
+        tmp_path.unlink(missing_ok=True)
 
     # 복원 완료 후 홈으로 이동
     return RedirectResponse(url="/", status_code=303)
@@ -18,10 +18,18 @@ from datetime import date
 from typing import Optional
 
 from fastapi import APIRouter, Request, Form, Depends, HTTPException
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, Response
+from sqlalchemy import delete, update
 from sqlalchemy.orm import Session
 
-from deps import templates  # Jinja 템플릿 엔진
+from deps import (
+    render_page,           # 템플릿 렌더링 (미리 컴파일해 둔 템플릿 사용)
+    get_today,             # (오늘 date, "YYYY-MM-DD") 의존성
+    weak_etag,             # 내용 해시로 만든 약한 ETag
+    etag_matches,          # If-None-Match 비교 (→ 304)
+    invalidate_cache,      # 대시보드 캐시 비우기
+    schedule_sort_value,   # 정렬용 sort_key 계산
+)
 from db import get_db
 from models import Schedule
 
@@ -30,11 +38,12 @@ router = APIRouter()
 
 
 # ---------------------------------------------------------
-# 헬퍼 함수: Schedule ORM → 템플릿/JSON에서 쓰기 좋은 dict
+# 헬퍼 함수: Schedule ORM → JSON API 에서 쓰기 좋은 dict
 # ---------------------------------------------------------
 def _schedule_to_dict(row: Schedule) -> dict:
     """
-    ORM 모델 Schedule 객체를 템플릿 또는 JSON API에서 쓰기 편한 dict 구조로 변환한다.
+    ORM 모델 Schedule 객체를 JSON API(인라인 에디터)에서 쓰기 편한 dict 구조로 변환한다.
+    (목록 화면은 dict 로 옮기지 않고 _SCHEDULE_COLUMNS Row 를 그대로 템플릿에 넘긴다.)
     """
     return {
         "id": str(row.id),
@@ -48,15 +57,30 @@ def _schedule_to_dict(row: Schedule) -> dict:
     }
 
 
+# 목록 화면에서 필요한 컬럼만 조회할 때 사용.
+# ORM 객체(identity map 등록, 상태 추적)를 만들지 않고 가벼운 Row 튜플로 받는다.
+# 템플릿은 item.time_str / item.place 처럼 속성으로 읽으므로 Row 를 그대로 넘긴다.
+_SCHEDULE_COLUMNS = (
+    Schedule.id,
+    Schedule.date,
+    Schedule.title,
+    Schedule.memo,
+    Schedule.time_str,
+    Schedule.place,
+    Schedule.done,
+)
+
+
 # =========================================================
 # 1) 일정 목록 화면
 # =========================================================
 @router.get("/schedule", response_class=HTMLResponse, name="schedule_page")
-async def schedule_page(
+def schedule_page(
     request: Request,
     start: Optional[str] = None,   # 필터 시작일(옵션)
     end: Optional[str] = None,     # 필터 종료일(옵션)
     db: Session = Depends(get_db),
+    today_info: tuple[date, str] = Depends(get_today),
 ):
     """
     일정 목록 화면.
@@ -65,11 +89,10 @@ async def schedule_page(
        - '오늘 날짜 이상'인 일정만 보여준다. (과거 일정은 목록에서 제외)
     ✔ start, end 쿼리 파라미터가 있으면 해당 기간으로 필터링한다.
     """
-    today = date.today()
-    today_str = today.isoformat()
+    today, today_str = today_info
 
-    # 모든 일정 SELECT
-    query = db.query(Schedule)
+    # 모든 일정 SELECT (화면에 필요한 컬럼만)
+    query = db.query(*_SCHEDULE_COLUMNS)
 
     # -----------------------------
     # 기본: 오늘 이후 일정만
@@ -101,17 +124,15 @@ async def schedule_page(
     else:
         end_date = None
 
-    # 날짜 → 제목 순 정렬
-    rows = (
+    # 날짜 → 제목 순 정렬 (Row 그대로 템플릿에 넘긴다)
+    items = (
         query
         .order_by(Schedule.date.asc(), Schedule.title.asc())
         .all()
     )
 
-    items = [_schedule_to_dict(r) for r in rows]
-
     # 화면 렌더링
-    return templates.TemplateResponse(
+    return render_page(
         "schedule.html",
         {
             "request": request,
@@ -129,13 +150,16 @@ async def schedule_page(
 # 2) 일정 생성 폼
 # =========================================================
 @router.get("/schedule/new", response_class=HTMLResponse, name="new_schedule_form")
-async def new_schedule_form(request: Request):
+def new_schedule_form(
+    request: Request,
+    today_info: tuple[date, str] = Depends(get_today),
+):
     """
     일정 생성 폼 보여주는 페이지.
     기본 날짜는 '오늘 날짜'.
     """
-    today_str = date.today().isoformat()
-    return templates.TemplateResponse(
+    _, today_str = today_info
+    return render_page(
         "schedule_form.html",
         {
             "request": request,
@@ -148,7 +172,7 @@ async def new_schedule_form(request: Request):
 # 3) 일정 생성 처리 (POST)
 # =========================================================
 @router.post("/schedule/new")
-async def create_schedule(
+def create_schedule(
     request: Request,
     date_str: str = Form(...),     # 날짜 (필수)
     title: str = Form(...),        # 제목 (필수)
@@ -167,10 +191,12 @@ async def create_schedule(
         memo=memo or None,          # 빈 문자열이면 None 저장
         time_str=time_str or None,
         place=place or None,
+        sort_key=schedule_sort_value(date_str, time_str),
     )
     db.add(item)
     db.commit()
     db.refresh(item)  # INSERT 후 생성된 PK(id) 반영
+    invalidate_cache("schedule")
 
     return RedirectResponse(url="/schedule", status_code=303)
 
@@ -179,7 +205,7 @@ async def create_schedule(
 # 4) 일정 수정 처리 (POST)
 # =========================================================
 @router.post("/schedule/{schedule_id}/update", response_class=RedirectResponse)
-async def update_schedule(
+def update_schedule(
     schedule_id: str,
     date_str: str = Form(...),
     title: str = Form(...),
@@ -190,20 +216,26 @@ async def update_schedule(
 ):
     """
     일정 수정 처리.
-    - 기존 Schedule 객체를 가져와서 필드를 업데이트한다.
+    - 기존 행을 먼저 SELECT 하지 않고 UPDATE ... WHERE id = ? 한 번으로 고친다.
+    - 바뀐 행이 없으면(rowcount == 0) 없는 일정이므로 404.
     """
-    item = db.get(Schedule, int(schedule_id))
-    if not item:
+    result = db.execute(
+        update(Schedule)
+        .where(Schedule.id == int(schedule_id))
+        .values(
+            date=date_str,
+            title=title,
+            memo=memo or None,
+            time_str=time_str or None,
+            place=place or None,
+            sort_key=schedule_sort_value(date_str, time_str),
+        )
+    )
+    if result.rowcount == 0:
         raise HTTPException(status_code=404, detail="Schedule not found")
 
-    item.date = date_str
-    item.title = title
-    item.memo = memo or None
-    item.time_str = time_str or None
-    item.place = place or None
-
-    db.add(item)
     db.commit()
+    invalidate_cache("schedule")
 
     return RedirectResponse(url="/schedule", status_code=303)
 
@@ -212,19 +244,20 @@ async def update_schedule(
 # 5) 일정 삭제
 # =========================================================
 @router.post("/schedule/{schedule_id}/delete", response_class=RedirectResponse)
-async def delete_schedule(
+def delete_schedule(
     schedule_id: str,
     db: Session = Depends(get_db),
 ):
     """
     일정 삭제.
+    - SELECT 없이 DELETE ... WHERE id = ? 한 번으로 지우고, 지운 행이 없으면 404.
     """
-    item = db.get(Schedule, int(schedule_id))
-    if not item:
+    result = db.execute(delete(Schedule).where(Schedule.id == int(schedule_id)))
+    if result.rowcount == 0:
         raise HTTPException(status_code=404, detail="Schedule not found")
 
-    db.delete(item)
     db.commit()
+    invalidate_cache("schedule")
 
     return RedirectResponse(url="/schedule", status_code=303)
 
@@ -233,16 +266,27 @@ async def delete_schedule(
 # 6) 일정 JSON API (인라인 에디터용)
 # =========================================================
 @router.get("/api/schedule/{schedule_id}")
-async def api_get_schedule(
+def api_get_schedule(
+    request: Request,
+    response: Response,
     schedule_id: str,
     db: Session = Depends(get_db),
 ):
     """
     일정 탭 오른쪽 인라인 에디터용 JSON 데이터 반환 API.
     - 프론트엔드에서 fetch로 호출해서 JSON 데이터를 가져감.
+    - 같은 일정을 다시 열 때 내용이 그대로면 본문 없이 304. (routers/diary.py 의 api_get_entry 와 같은 방식)
     """
     item = db.get(Schedule, int(schedule_id))
     if not item:
         raise HTTPException(status_code=404, detail="Schedule not found")
 
-    return _schedule_to_dict(item)
+    data = _schedule_to_dict(item)
+
+    etag = weak_etag(data)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return data
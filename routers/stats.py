@@ -11,24 +11,68 @@
 #
 # 주의할 점:
 #   - Todo.date 는 문자열("YYYY-MM-DD")로 저장되어 있으므로
-#     비교하려면 date 객체로 변환해서 처리해야 한다.
+#     문자열 비교가 곧 날짜 비교다. (개수 계산은 DB 의 GROUP BY 로 한다)
 #   - 파라미터 start/end 가 없으면 전체 기간을 사용한다.
 # -----------------------------------------------
 
 from datetime import date
 from fastapi import APIRouter, Request, Depends
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, Response
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
-from deps import templates
+from deps import etag_matches, render_page, weak_etag
 from db import get_db
 from models import Todo
 
 router = APIRouter()
 
 
+def _status_counts(query) -> dict[str, int]:
+    """
+    (status, COUNT(*)) 쿼리에 GROUP BY status 를 붙여 실행하고
+    {"done": 3, "pending": 5, ...} 형태로 돌려준다.
+    """
+    return dict(query.group_by(Todo.status).all())
+
+
+def _summarize(prefix: str, counts: dict[str, int]) -> dict:
+    """
+    상태별 개수(counts)로 템플릿에 넘길 값을 만든다.
+    예) prefix="range" → range_total / range_done / range_giveup / range_pending /
+                         range_done_rate / range_gaveup_rate
+    - 비율은 % 로 소수 첫째 자리까지, 항목이 없으면 0.0 (0 으로 나누는 것 방지)
+    """
+    total = sum(counts.values())
+    done = counts.get("done", 0)
+    giveup = counts.get("giveup", 0)
+
+    return {
+        f"{prefix}_total": total,
+        f"{prefix}_done": done,
+        f"{prefix}_giveup": giveup,
+        f"{prefix}_pending": counts.get("pending", 0),
+        f"{prefix}_done_rate": round(done / total * 100, 1) if total else 0.0,
+        f"{prefix}_gaveup_rate": round(giveup / total * 100, 1) if total else 0.0,
+    }
+
+
+def _render_stats(request: Request, stats: dict):
+    """
+    계산한 통계(stats)로 stats.html 을 렌더링한다.
+    - 통계 숫자로 약한 ETag 를 만들어서, 브라우저가 같은 ETag 를 보내면
+      (Todo 가 그대로면) 템플릿 렌더링/전송 없이 304 로 끝낸다.
+    """
+    etag = weak_etag(stats)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    return render_page("stats.html", {"request": request, **stats}, headers=headers)
+
+
 @router.get("/stats", response_class=HTMLResponse, name="stats_page")
-async def stats_page(
+def stats_page(
     request: Request,
     start: str | None = None,   # 쿼리로 들어오는 시작 날짜 (YYYY-MM-DD)
     end: str | None = None,     # 쿼리로 들어오는 종료 날짜
@@ -43,140 +87,53 @@ async def stats_page(
     """
 
     # --------------------------------------------------------
-    # 1) 전체 Todo 데이터를 전부 가져오기
-    # --------------------------------------------------------
-    rows = (
-        db.query(Todo)
-        .order_by(Todo.date.asc())  # 날짜 오름차순 정렬
-        .all()
-    )
-
-    # 데이터가 하나도 없으면 0으로 가득찬 화면 렌더링
-    if not rows:
-        return templates.TemplateResponse(
-            "stats.html",
-            {
-                "request": request,
-                # 전체 기간
-                "overall_total": 0,
-                "overall_done": 0,
-                "overall_giveup": 0,
-                "overall_pending": 0,
-                "overall_done_rate": 0.0,
-                "overall_gaveup_rate": 0.0,
-                # 선택 기간
-                "start": None,
-                "end": None,
-                "range_total": 0,
-                "range_done": 0,
-                "range_giveup": 0,
-                "range_pending": 0,
-                "range_done_rate": 0.0,
-                "range_gaveup_rate": 0.0,
-            },
-        )
-
-    # rows -> Todo 객체 리스트
-    items = rows
-
-    # --------------------------------------------------------
-    # 2) 전체 기간 통계 계산
-    # --------------------------------------------------------
-
-    # 전체 항목 수
-    overall_total = len(items)
-
-    # 상태별 개수 계산
-    overall_done    = sum(1 for it in items if it.status == "done")
-    overall_giveup  = sum(1 for it in items if it.status == "giveup")
-    overall_pending = sum(1 for it in items if it.status == "pending")
-
-    # 비율 계산 (0 으로 나누는 것 방지)
-    if overall_total > 0:
-        overall_done_rate   = round(overall_done / overall_total * 100, 1)
-        overall_gaveup_rate = round(overall_giveup / overall_total * 100, 1)
-    else:
-        overall_done_rate = overall_gaveup_rate = 0.0
-
-    # --------------------------------------------------------
-    # 3) 전체 Todo 데이터의 날짜 범위 구하기
+    # 1) 전체 Todo 의 날짜 범위 (가장 이른 날 / 가장 늦은 날)
     #    → 선택 기간을 지정하지 않으면 이 값을 기본값으로 사용
-    #
-    # Todo.date 는 문자열이므로 date 객체로 변환해서 판단해야 한다.
+    #    Todo 행을 전부 가져오지 않고 DB 에서 MIN/MAX 만 받는다.
     # --------------------------------------------------------
+    first_date, last_date = db.query(func.min(Todo.date), func.max(Todo.date)).one()
 
-    # 모든 Todo.date 값을 set → sorted → 첫날/마지막날 추출
-    all_dates = sorted({it.date for it in items})
-
-    # 데이터가 존재하니까 all_dates[0]과 [-1]은 항상 존재
-    default_start = date.fromisoformat(all_dates[0])
-    default_end   = date.fromisoformat(all_dates[-1])
-
-    # 쿼리(start, end)가 있다면 변환하고,
-    # 없다면 default 사용
-    if start:
-        start_date = date.fromisoformat(start)
-    else:
-        start_date = default_start
-
-    if end:
-        end_date = date.fromisoformat(end)
+    if first_date is None:
+        # 데이터가 하나도 없으면 개수는 전부 0, 기간은 비워 둔다.
+        overall: dict[str, int] = {}
+        ranged: dict[str, int] = {}
+        start_str = end_str = None
     else:
-        end_date = default_end
-
-    # --------------------------------------------------------
-    # 4) 선택 기간(start_date~end_date) 통계 계산
-    #    - Todo.date 문자열을 date로 변환 후 범위 체크
-    # --------------------------------------------------------
-
-    def in_range(it: Todo) -> bool:
-        """
-        이 Todo 가 선택된 기간 안에 포함되는지 판단.
-        """
-        d = date.fromisoformat(it.date)
-        return (d >= start_date) and (d <= end_date)
-
-    # 선택 기간에 해당하는 Todo 객체들만 필터링
-    ranged = [it for it in items if in_range(it)]
-
-    # 기간 내 개수
-    range_total   = len(ranged)
-    range_done    = sum(1 for it in ranged if it.status == "done")
-    range_giveup  = sum(1 for it in ranged if it.status == "giveup")
-    range_pending = sum(1 for it in ranged if it.status == "pending")
-
-    if range_total > 0:
-        range_done_rate   = round(range_done / range_total * 100, 1)
-        range_gaveup_rate = round(range_giveup / range_total * 100, 1)
-    else:
-        range_done_rate = range_gaveup_rate = 0.0
+        # ----------------------------------------------------
+        # 2) 전체 기간 통계 (상태별 개수는 DB 의 GROUP BY 로)
+        # ----------------------------------------------------
+        overall = _status_counts(db.query(Todo.status, func.count()))
+
+        # ----------------------------------------------------
+        # 3) 선택 기간 정하기
+        # ----------------------------------------------------
+        # 쿼리(start, end)가 있다면 변환하고 (형식 검사 겸),
+        # 없다면 전체 날짜 범위를 사용
+        start_str = (date.fromisoformat(start) if start else date.fromisoformat(first_date)).isoformat()
+        end_str = (date.fromisoformat(end) if end else date.fromisoformat(last_date)).isoformat()
+
+        # ----------------------------------------------------
+        # 4) 선택 기간(start~end) 통계
+        #    - Todo.date 는 "YYYY-MM-DD" 문자열이라 문자열 비교가 곧 날짜 비교다.
+        #      (행마다 date 로 변환하지 않고 WHERE 절에서 바로 거른다)
+        # ----------------------------------------------------
+        ranged = _status_counts(
+            db.query(Todo.status, func.count()).filter(
+                Todo.date >= start_str,
+                Todo.date <= end_str,
+            )
+        )
 
     # --------------------------------------------------------
     # 5) 템플릿 렌더링(stats.html)
+    #    - 전체 기간: overall_*, 선택 기간: range_* (+ start/end)
     # --------------------------------------------------------
-    return templates.TemplateResponse(
-        "stats.html",
+    return _render_stats(
+        request,
         {
-            "request": request,
-
-            # 전체 기간 통계
-            "overall_total": overall_total,
-            "overall_done": overall_done,
-            "overall_giveup": overall_giveup,
-            "overall_pending": overall_pending,
-            "overall_done_rate": overall_done_rate,
-            "overall_gaveup_rate": overall_gaveup_rate,
-
-            # 선택한 기간(start~end) 정보
-            "start": start_date.isoformat(),
-            "end": end_date.isoformat(),
-
-            # 선택 기간 내 통계
-            "range_total": range_total,
-            "range_done": range_done,
-            "range_giveup": range_giveup,
-            "range_pending": range_pending,
-            "range_done_rate": range_done_rate,
-            "range_gaveup_rate": range_gaveup_rate,
+            **_summarize("overall", overall),
+            "start": start_str,
+            "end": end_str,
+            **_summarize("range", ranged),
         },
     )
@@ -24,15 +24,20 @@
 
 from datetime import date
 from typing import List
+from uuid import uuid4
 
 from fastapi import APIRouter, Request, Form, Body, Depends, HTTPException
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import case, delete, func, insert, literal, select, update
 
 from deps import (
     HISTORY_ITEMS_PER_PAGE,  # 히스토리(완료/포기) 페이지당 개수
-    templates,
+    render_page,
+    invalidate_cache,        # 수정 후 대시보드용 todo 캐시 비우기
+    get_today,               # (오늘 date, "YYYY-MM-DD") 의존성
+    weak_etag,               # 내용 해시로 만든 약한 ETag
+    etag_matches,            # If-None-Match 비교 (→ 304)
 )
 from db import get_db
 from models import Todo
@@ -41,34 +46,145 @@ router = APIRouter()
 
 
 # ---------------------------------------------------------
-# 헬퍼 함수: Todo ORM → dict
+# 목록 화면에서 필요한 컬럼만 조회할 때 사용
 # ---------------------------------------------------------
-def _todo_to_dict(row: Todo) -> dict:
+# ORM 객체(identity map 등록, 상태 추적)를 만들지 않고 가벼운 Row 로 받아서
+# dict 로 옮기지 않고 그대로 템플릿에 넘긴다. Row 도 속성으로 읽을 수 있어서
+# 템플릿에서는 예전처럼 {{ item.id }}, {{ item.title }}, {{ item.status }} 로 쓴다.
+_TODO_COLUMNS = (
+    Todo.id,
+    Todo.date,      # "YYYY-MM-DD"
+    Todo.title,
+    Todo.status,    # "pending" / "done" / "giveup"
+    Todo.order,     # 정렬용 인덱스
+)
+
+
+# ---------------------------------------------------------
+# 헬퍼 함수: 완료/포기 히스토리 한 페이지 조회
+# ---------------------------------------------------------
+def _load_history(
+    db: Session,
+    start: str | None,
+    end: str | None,
+    history_status: str,
+    history_page: int,
+) -> dict:
     """
-    SQLAlchemy Todo 객체를 템플릿/JSON에서 사용하기 쉬운 dict 형태로 변환.
-
-    템플릿에서:
-      - {{ item.id }}
-      - {{ item.date }}
-      - {{ item.title }}
-      - {{ item.status }}
-      - {{ item.order }}
-    이런 식으로 바로 접근할 수 있게 하기 위한 헬퍼.
+    완료/포기 히스토리 한 페이지를 조회해서 템플릿(todos_history.html)용 값으로 돌려준다.
+
+    - /todos (open_history=1 로 열린 채 들어왔을 때) 와
+      /todos/history (닫힌 패널을 처음 열 때 JS 가 부르는 조각) 가 같이 쓴다.
     """
+    # -----------------------------------------------------
+    # 1) 완료/포기 히스토리 조회 쿼리 구성
+    # -----------------------------------------------------
+    # 상태 필터 (all / done / giveup)
+    # - done/giveup 하나만 고르면 status = ? 조건 하나만 건다.
+    #   (IN ('done','giveup') 에 status = ? 를 또 붙이지 않아서
+    #    ix_todos_status_date_id 를 한 구간만 읽는다)
+    # - 그 밖의 값(all 등)은 전체(완료 + 포기)
+    status_key = history_status or "all"
+    if status_key in ("done", "giveup"):
+        status_filter = Todo.status == status_key
+    else:
+        status_filter = Todo.status.in_(["done", "giveup"])
+
+    history_query = db.query(*_TODO_COLUMNS).filter(status_filter)
+
+    # 시작일 필터
+    if start:
+        try:
+            start_date = date.fromisoformat(start)
+            # date 칼럼이 문자열(YYYY-MM-DD)이라면 isoformat()과 비교해도 무방
+            history_query = history_query.filter(Todo.date >= start_date.isoformat())
+        except ValueError:
+            # 잘못된 날짜 형식이면 필터를 적용하지 않고 무시
+            pass
+
+    # 종료일 필터
+    if end:
+        try:
+            end_date = date.fromisoformat(end)
+            history_query = history_query.filter(Todo.date <= end_date.isoformat())
+        except ValueError:
+            pass
+
+    # 날짜 내림차순, id 내림차순 (가장 최근 것이 위로 오도록)
+    history_query = history_query.order_by(Todo.date.desc(), Todo.id.desc())
+
+    # -----------------------------------------------------
+    # 2) 히스토리 페이징 처리
+    # -----------------------------------------------------
+    per_page = HISTORY_ITEMS_PER_PAGE
+
+    # 해당 페이지 행 + 전체 개수를 한 번의 쿼리로 가져온다. (routers/diary.py 목록과 같은 방식)
+    #   COUNT(*) OVER () : LIMIT/OFFSET 전에 계산되므로 필터에 걸린 전체 개수가 모든 행에 붙는다.
+    #   (예전에는 count() 로 DB 를 한 번 더 다녀왔다.)
+    counted = history_query.add_columns(func.count().over().label("total_history"))
+
+    def fetch_page(page: int) -> list:
+        return counted.offset((page - 1) * per_page).limit(per_page).all()
+
+    page = max(1, history_page)
+    history_rows = fetch_page(page)
+
+    if history_rows:
+        total_history = history_rows[0].total_history
+    elif page > 1:
+        # 범위를 벗어난 page 요청 → 행이 없어서 개수도 모르므로, 이때만 따로 센다.
+        total_history = history_query.order_by(None).count()
+    else:
+        total_history = 0
+
+    if total_history > 0:
+        # 올림 나눗셈: (total + per_page - 1) // per_page
+        total_pages = max(1, (total_history + per_page - 1) // per_page)
+    else:
+        total_pages = 1
+
+    # 요청된 페이지 번호를 1~total_pages 범위로 보정 (마지막 페이지로 옮겨서 다시 가져온다)
+    if page > total_pages:
+        page = total_pages
+        history_rows = fetch_page(page)
+
     return {
-        "id": row.id,
-        "date": row.date,       # "YYYY-MM-DD"
-        "title": row.title,
-        "status": row.status,   # "pending" / "done" / "giveup"
-        "order": row.order,     # 정렬용 인덱스
+        "history_items": history_rows,          # 히스토리 페이지 데이터 (Row 그대로)
+        "history_start": start,                 # 기간 필터 시작값 (문자열 그대로)
+        "history_end": end,                     # 기간 필터 종료값
+        "history_status": status_key,           # 현재 선택된 상태 필터
+        "history_page": page,                   # 현재 히스토리 페이지
+        "history_total_pages": total_pages,     # 히스토리 전체 페이지 수
     }
 
 
+# ---------------------------------------------------------
+# 헬퍼 함수: ETag 를 붙여서 렌더링 (그대로면 304)
+# ---------------------------------------------------------
+def _render_todos(name: str, context: dict):
+    """
+    context 로 템플릿(name)을 렌더링한다. (routers/stats.py 의 _render_stats 와 같은 방식)
+    - 화면에 들어가는 값(Row 목록, 필터, 페이지)으로 약한 ETag 를 만들어서,
+      브라우저가 같은 ETag 를 보내면 템플릿 렌더링/전송 없이 304 로 끝낸다.
+    - Row 는 orjson 이 바로 직렬화하지 못해서 tuple 로 바꿔서 해시한다.
+    """
+    etag = weak_etag(name, [
+        (key, [tuple(r) for r in value] if isinstance(value, list) else value)
+        for key, value in context.items()
+        if key != "request"
+    ])
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(context["request"], etag):
+        return Response(status_code=304, headers=headers)
+
+    return render_page(name, context, headers=headers)
+
+
 # =========================================================
 # 1) 메인 To-do 페이지
 # =========================================================
 @router.get("/todos", response_class=HTMLResponse, name="todo_page")
-async def todo_page(
+def todo_page(
     request: Request,
     start: str | None = None,          # 히스토리 시작 날짜 필터 (YYYY-MM-DD)
     end: str | None = None,            # 히스토리 종료 날짜 필터 (YYYY-MM-DD)
@@ -88,111 +204,76 @@ async def todo_page(
       - /todos                           → 기본 (히스토리 닫힘)
       - /todos?open_history=1           → 히스토리 패널 열린 상태
       - /todos?start=2025-01-01&end=... → 기간 필터 적용
+
+    히스토리 패널이 닫힌 채 들어오면(대부분의 경우) 히스토리 쿼리를 아예 실행하지 않는다.
+    사용자가 패널을 처음 열 때 JS 가 /todos/history 조각을 받아서 채운다.
     """
 
     # -----------------------------------------------------
     # 1) 진행 중(pending) 목록 조회
     # -----------------------------------------------------
     pending_query = (
-        db.query(Todo)
+        db.query(*_TODO_COLUMNS)
         .filter(Todo.status == "pending")
         .order_by(Todo.order.asc(), Todo.date.asc())
     )
-    pending_rows = pending_query.all()
-    pending_items = [_todo_to_dict(r) for r in pending_rows]
+    # 현재 화면에서 보여줄 메인 리스트 (Row 그대로)
+    visible_items = pending_query.all()
 
-    # 현재 화면에서 보여줄 메인 리스트
-    visible_items = pending_items
+    # open_history(0/1) → bool 로 변환
+    history_open = bool(open_history)
+
+    context = {
+        "request": request,
+        "items": visible_items,                 # 진행 중 목록
+        "history_open": history_open,           # 서버 기준 open 여부 (JS는 URL 파라미터를 사용)
+        "history_loaded": history_open,         # False 면 템플릿은 히스토리 자리를 비워 두고 JS 가 채운다
+        "history_start": start,
+        "history_end": end,
+        "history_status": history_status or "all",
+    }
 
     # -----------------------------------------------------
-    # 2) 완료/포기 히스토리 조회 쿼리 구성
+    # 2) 열린 상태로 들어왔을 때만 완료/포기 히스토리 조회
     # -----------------------------------------------------
-    history_query = db.query(Todo).filter(Todo.status.in_(["done", "giveup"]))
-
-    # 날짜 필터용 변수 (템플릿에서도 그대로 보여줄 수 있도록 저장)
-    start_date = None
-    end_date = None
-
-    # 시작일 필터
-    if start:
-        try:
-            start_date = date.fromisoformat(start)
-            # date 칼럼이 문자열(YYYY-MM-DD)이라면 isoformat()과 비교해도 무방
-            history_query = history_query.filter(Todo.date >= start_date.isoformat())
-        except ValueError:
-            # 잘못된 날짜 형식이면 필터를 적용하지 않고 무시
-            start_date = None
-
-    # 종료일 필터
-    if end:
-        try:
-            end_date = date.fromisoformat(end)
-            history_query = history_query.filter(Todo.date <= end_date.isoformat())
-        except ValueError:
-            end_date = None
-
-    # 상태 필터 (all / done / giveup)
-    status_key = history_status or "all"
-    if status_key == "done":
-        history_query = history_query.filter(Todo.status == "done")
-    elif status_key == "giveup":
-        history_query = history_query.filter(Todo.status == "giveup")
-
-    # 날짜 내림차순, id 내림차순 (가장 최근 것이 위로 오도록)
-    history_query = history_query.order_by(Todo.date.desc(), Todo.id.desc())
+    if history_open:
+        context.update(_load_history(db, start, end, history_status, history_page))
 
     # -----------------------------------------------------
-    # 3) 히스토리 페이징 처리
+    # 3) 템플릿 렌더링 (내용이 그대로면 304)
     # -----------------------------------------------------
-    per_page = HISTORY_ITEMS_PER_PAGE
-    total_history = history_query.count()
-
-    if total_history > 0:
-        # 올림 나눗셈: (total + per_page - 1) // per_page
-        total_pages = max(1, (total_history + per_page - 1) // per_page)
-    else:
-        total_pages = 1
-
-    # 요청된 페이지 번호를 1~total_pages 범위로 보정
-    page = max(1, min(history_page, total_pages))
-
-    history_rows = (
-        history_query
-        .offset((page - 1) * per_page)
-        .limit(per_page)
-        .all()
-    )
-    history_page_items = [_todo_to_dict(r) for r in history_rows]
+    return _render_todos("todos.html", context)
 
-    # open_history(0/1) → bool 로 변환 (템플릿에서 필요하면 사용)
-    history_open = bool(open_history)
 
-    # -----------------------------------------------------
-    # 4) 템플릿 렌더링
-    # -----------------------------------------------------
-    return templates.TemplateResponse(
-        "todos.html",
-        {
-            "request": request,
-            "items": visible_items,                 # 진행 중 목록
-            "history_items": history_page_items,    # 히스토리 페이지 데이터
-            "history_start": start,                 # 기간 필터 시작값 (문자열 그대로)
-            "history_end": end,                     # 기간 필터 종료값
-            "history_status": status_key,           # 현재 선택된 상태 필터
-            "history_page": page,                   # 현재 히스토리 페이지
-            "history_total_pages": total_pages,     # 히스토리 전체 페이지 수
-            "history_open": history_open,           # 서버 기준 open 여부 (JS는 URL 파라미터를 사용)
-        },
-    )
+# =========================================================
+# 1-1) 완료/포기 히스토리 조각 (패널을 처음 열 때 JS 가 호출)
+# =========================================================
+@router.get("/todos/history", response_class=HTMLResponse, name="todo_history")
+def todo_history(
+    request: Request,
+    start: str | None = None,
+    end: str | None = None,
+    history_status: str = "all",
+    history_page: int = 1,
+    db: Session = Depends(get_db),
+):
+    """
+    /todos 의 히스토리 패널 내용(페이지 이동 + 목록)만 HTML 조각으로 돌려준다.
+    - 쿼리 파라미터는 /todos 와 같다. (JS 가 현재 URL 의 쿼리를 그대로 붙여서 부른다)
+    """
+    context = {"request": request}
+    context.update(_load_history(db, start, end, history_status, history_page))
+    return _render_todos("todos_history.html", context)
 
 
 # =========================================================
 # 2) To-do 생성
 # =========================================================
 @router.post("/todos", response_class=RedirectResponse)
-async def create_todo(
+def create_todo(
     title: str = Form(...),
     db: Session = Depends(get_db),
+    today_info: tuple[date, str] = Depends(get_today),
 ):
     """
     새로운 Todo 생성.
@@ -201,25 +282,29 @@ async def create_todo(
       - 항상 "오늘 날짜(date.today())"로 생성
       - status = "pending"
       - order = 현재 pending 중 가장 큰 값 + 1
+
+    MAX(order) 를 먼저 조회하고 INSERT 하지 않고, 한 문장으로 넣는다:
+      INSERT INTO todos (id, date, title, status, "order", ...)
+      SELECT :id, :date, :title, 'pending', COALESCE(MAX("order"), 0) + 1 ...
+      FROM todos WHERE status = 'pending'
+    (pending 이 하나도 없어도 MAX 집계는 한 행(NULL)을 돌려주므로 order = 1 로 들어간다)
     """
-    # pending 상태에서 가장 큰 order 값 조회
-    max_order = (
-        db.query(func.max(Todo.order))
-        .filter(Todo.status == "pending")
-        .scalar()
+    next_order = select(
+        literal(str(uuid4())),      # uuid 문자열로 id 생성
+        literal(today_info[1]),
+        literal(title),
+        literal("pending"),
+        func.coalesce(func.max(Todo.order), 0) + 1,
+    ).where(Todo.status == "pending")
+
+    db.execute(
+        insert(Todo).from_select(
+            ["id", "date", "title", "status", "order"],
+            next_order,
+        )
     )
-    next_order = (max_order or 0) + 1
-
-    # uuid 문자열로 id 생성
-    new_item = Todo(
-        id=str(__import__("uuid").uuid4()),
-        date=date.today().isoformat(),
-        title=title,
-        status="pending",
-        order=next_order,
-    )
-    db.add(new_item)
     db.commit()
+    invalidate_cache("todos")
 
     # 303 See Other: POST 이후 GET /todos 로 리다이렉트
     return RedirectResponse(url="/todos", status_code=303)
@@ -233,7 +318,7 @@ async def create_todo(
     response_class=RedirectResponse,
     name="update_todo",
 )
-async def update_todo(
+def update_todo(
     todo_id: str,
     title: str = Form(...),
     db: Session = Depends(get_db),
@@ -241,14 +326,14 @@ async def update_todo(
     """
     Todo 제목 수정.
     - 주로 진행 중(pending) 리스트에서 인라인 수정에 사용.
+    - SELECT 없이 UPDATE 한 번으로 고치고, 바뀐 행이 없으면 404.
     """
-    item = db.get(Todo, todo_id)
-    if not item:
+    result = db.execute(update(Todo).where(Todo.id == todo_id).values(title=title))
+    if result.rowcount == 0:
         raise HTTPException(status_code=404, detail="Todo not found")
 
-    item.title = title
-    db.add(item)
     db.commit()
+    invalidate_cache("todos")
 
     return RedirectResponse(url="/todos", status_code=303)
 
@@ -257,21 +342,20 @@ async def update_todo(
 # 4) 완료 처리
 # =========================================================
 @router.post("/todos/{todo_id}/done", response_class=RedirectResponse)
-async def mark_todo_done(
+def mark_todo_done(
     todo_id: str,
     db: Session = Depends(get_db),
 ):
     """
     Todo를 '완료(done)' 상태로 변경.
-    - pending → done 으로 상태만 바꿔준다.
+    - pending → done 으로 상태만 바꿔준다. (SELECT 없이 UPDATE 한 번, 없으면 404)
     """
-    item = db.get(Todo, todo_id)
-    if not item:
+    result = db.execute(update(Todo).where(Todo.id == todo_id).values(status="done"))
+    if result.rowcount == 0:
         raise HTTPException(status_code=404, detail="Todo not found")
 
-    item.status = "done"
-    db.add(item)
     db.commit()
+    invalidate_cache("todos")
 
     # 완료 처리 후에는 기본 /todos 로 돌아가고,
     # 히스토리는 필요하면 사용자가 "열기"로 확인.
@@ -282,21 +366,20 @@ async def mark_todo_done(
 # 5) 포기 처리
 # =========================================================
 @router.post("/todos/{todo_id}/giveup", response_class=RedirectResponse)
-async def mark_todo_giveup(
+def mark_todo_giveup(
     todo_id: str,
     db: Session = Depends(get_db),
 ):
     """
     Todo를 '포기(giveup)' 상태로 변경.
-    - pending → giveup 으로 상태만 바꿔준다.
+    - pending → giveup 으로 상태만 바꿔준다. (SELECT 없이 UPDATE 한 번, 없으면 404)
     """
-    item = db.get(Todo, todo_id)
-    if not item:
+    result = db.execute(update(Todo).where(Todo.id == todo_id).values(status="giveup"))
+    if result.rowcount == 0:
         raise HTTPException(status_code=404, detail="Todo not found")
 
-    item.status = "giveup"
-    db.add(item)
     db.commit()
+    invalidate_cache("todos")
 
     return RedirectResponse(url="/todos", status_code=303)
 
@@ -309,7 +392,7 @@ async def mark_todo_giveup(
     response_class=RedirectResponse,
     name="delete_todo",
 )
-async def delete_todo(
+def delete_todo(
     todo_id: str,
     db: Session = Depends(get_db),
 ):
@@ -324,13 +407,15 @@ async def delete_todo(
       - 히스토리 패널에서 삭제한 뒤에도 패널이 접히지 않도록,
         항상 /todos?open_history=1 로 리다이렉트한다.
         (진행 중에서 삭제해도 동일한 URL로 가지만 문제 없음)
+
+    SELECT 없이 DELETE ... WHERE id = ? 한 번으로 지우고, 지운 행이 없으면 404.
     """
-    item = db.get(Todo, todo_id)
-    if not item:
+    result = db.execute(delete(Todo).where(Todo.id == todo_id))
+    if result.rowcount == 0:
         raise HTTPException(status_code=404, detail="Todo not found")
 
-    db.delete(item)
     db.commit()
+    invalidate_cache("todos")
 
     # 히스토리 패널을 계속 열린 상태로 유지하고 싶으므로
     # open_history=1 을 URL에 붙여서 리다이렉트한다.
@@ -341,7 +426,7 @@ async def delete_todo(
 # 7) 순서 변경 (드래그 정렬용)
 # =========================================================
 @router.post("/todos/reorder")
-async def reorder_todos(
+def reorder_todos(
     order: List[str] = Body(..., embed=True),
     db: Session = Depends(get_db),
 ):
@@ -358,24 +443,28 @@ async def reorder_todos(
 
     로직:
       1) order 리스트에서 id → index 매핑을 만든다.
-      2) pending Todo 들을 돌면서:
+      2) pending Todo 전체를 UPDATE 한 번으로 고친다:
          - 리스트 안에 있으면 해당 index 로 order 값을 설정
          - 리스트에 없으면 10_000_000 같은 아주 큰 숫자로 설정 (맨 뒤)
+         (예전처럼 행을 모두 읽어 와서 한 줄씩 UPDATE 하지 않는다)
     """
     # id → 새 order 인덱스 매핑
     order_map = {tid: idx for idx, tid in enumerate(order)}
 
-    pending_items = (
-        db.query(Todo)
-        .filter(Todo.status == "pending")
-        .all()
-    )
-
-    for item in pending_items:
-        # 리스트에 있으면 해당 인덱스, 없으면 매우 큰 번호로 보내기
-        item.order = order_map.get(item.id, 10_000_000)
-        db.add(item)
+    # UPDATE todos SET "order" = CASE id WHEN :id1 THEN 0 WHEN :id2 THEN 1 ... ELSE 10000000 END
+    # WHERE status = 'pending'
+    # (CASE 는 WHEN 이 하나 이상 있어야 하므로 빈 리스트면 전부 맨 뒤로)
+    if order_map:
+        new_order = case(order_map, value=Todo.id, else_=10_000_000)
+    else:
+        new_order = 10_000_000
 
+    db.execute(
+        update(Todo)
+        .where(Todo.status == "pending")
+        .values(order=new_order)
+    )
     db.commit()
+    invalidate_cache("todos")
 
     return {"status": "ok"}
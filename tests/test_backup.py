@@ -0,0 +1,50 @@
+# tests/test_backup.py
+# ---------------------------------------------------------------
+# 백업 ZIP 만들기(routers/backup.py) 테스트
+#
+# 실행:  python -m unittest discover -s tests
+# ---------------------------------------------------------------
+
+import io
+import os
+import random
+import tempfile
+import unittest
+import zipfile
+
+# deps/db 를 import 하기 전에 테스트용 DB 를 지정한다. (기본 ./steplog.db 를 건드리지 않게)
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "test.db"))
+
+from routers.backup import _iter_backup_zip  # noqa: E402
+
+
+class IterBackupZipTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+        # 압축은 되지만 레벨에 따라 크기가 달라지는 텍스트 (같은 단어가 무작위 순서로 반복)
+        rng = random.Random(0)
+        words = [f"word{i}" for i in range(500)]
+        self.upload_path = os.path.join(self.tmp.name, "note.txt")
+        with open(self.upload_path, "w", encoding="utf-8") as f:
+            f.write(" ".join(rng.choice(words) for _ in range(50_000)))
+
+    def _upload_compress_size(self, level: int) -> int:
+        data = b"".join(
+            _iter_backup_zip("backup.json", b"{}", [(self.upload_path, "ab/note.txt")], level)
+        )
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            info = zf.getinfo("uploads/ab/note.txt")
+            self.assertEqual(info.compress_type, zipfile.ZIP_DEFLATED)
+            with open(self.upload_path, "rb") as f:
+                self.assertEqual(zf.read(info), f.read())
+            return info.compress_size
+
+    def test_level_changes_upload_deflate_size(self):
+        # ?level= 값이 업로드 파일에도 실제로 적용되어야 한다.
+        self.assertLess(self._upload_compress_size(9), self._upload_compress_size(1))
+
+
+if __name__ == "__main__":
+    unittest.main()
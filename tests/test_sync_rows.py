@@ -0,0 +1,84 @@
+# tests/test_sync_rows.py
+# ---------------------------------------------------------------
+# deps._sync_rows (save_schedule / save_todos) 테스트
+#
+# 실행:  python -m unittest discover -s tests
+# ---------------------------------------------------------------
+
+import os
+import sqlite3
+import tempfile
+import unittest
+
+# deps/db 를 import 하기 전에 테스트용 DB 를 지정한다. (기본 ./steplog.db 를 건드리지 않게)
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "test.db"))
+
+from sqlalchemy import create_engine, event, func, select  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from db import Base  # noqa: E402
+from deps import ScheduleItem, TodoItem, save_schedule, save_todos  # noqa: E402
+from models import Schedule, Todo  # noqa: E402
+
+# 행 수가 이 값보다 많아도 저장이 되어야 한다. (옛 SQLite 빌드의 바인드 파라미터 제한)
+_SQLITE_OLD_VARIABLE_LIMIT = 999
+_ROW_COUNT = 1200
+
+
+class SyncRowsTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+
+        engine = create_engine(f"sqlite:///{tmp.name}/sync.db")
+        self.addCleanup(engine.dispose)
+
+        # 최근 SQLite 는 제한이 32766 이라서, 옛 빌드와 같은 999 로 낮춰서 테스트한다.
+        @event.listens_for(engine, "connect")
+        def _limit_variables(dbapi_conn, connection_record):
+            dbapi_conn.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, _SQLITE_OLD_VARIABLE_LIMIT)
+
+        Base.metadata.create_all(engine)
+        self.db = Session(engine)
+        self.addCleanup(self.db.close)
+
+    def _count(self, model) -> int:
+        return self.db.scalar(select(func.count()).select_from(model))
+
+    def test_save_todos_keeps_more_rows_than_variable_limit(self):
+        items = [
+            TodoItem(id=f"t{i}", date="2026-10-15", title=f"할 일 {i}")
+            for i in range(_ROW_COUNT)
+        ]
+        save_todos(self.db, items)
+        self.assertEqual(self._count(Todo), _ROW_COUNT)
+
+        # 남길 행(1100개)이 제한보다 많아도 나머지 100개만 지워져야 한다.
+        save_todos(self.db, items[:1100])
+        self.assertEqual(
+            sorted(self.db.scalars(select(Todo.id))),
+            sorted(it.id for it in items[:1100]),
+        )
+
+    def test_save_schedule_deletes_more_rows_than_variable_limit(self):
+        items = [
+            ScheduleItem(id=str(i), date="2026-10-15", title=f"일정 {i}")
+            for i in range(1, _ROW_COUNT + 1)
+        ]
+        save_schedule(self.db, items)
+        self.assertEqual(self._count(Schedule), _ROW_COUNT)
+
+        # 지울 행(1190개)이 제한보다 많은 경우
+        save_schedule(self.db, items[:10])
+        self.assertEqual(
+            sorted(self.db.scalars(select(Schedule.id))),
+            list(range(1, 11)),
+        )
+
+        # 전부 지우는 경우 (남길 id 가 하나도 없음)
+        save_schedule(self.db, [])
+        self.assertEqual(self._count(Schedule), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()